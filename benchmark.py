@@ -0,0 +1,180 @@
+import argparse
+import csv
+import importlib
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import timetable_generator as tg
+
+# Synthetic institutions are built from blocks shaped like the shipped dataset: three
+# departments with semesters 2, 4 and 6, a faculty pool, and a building of lecture rooms,
+# labs and large seaters. Scale N is N blocks, so rooms, faculty and courses grow together.
+BLOCK_DEPARTMENTS = ['CSE', 'DSAI', 'ECE']
+BLOCK_SEMESTERS = [2, 4, 6]
+BLOCK_ROOMS = ([(75, 'LECTURE_ROOM')] * 16 + [(45, 'COMPUTER_LAB')] * 7 + [(45, 'HARDWARE_LAB')] * 4
+               + [(120, 'SEATER_120')] * 2 + [(240, 'SEATER_240')])
+CORE_COURSES = 6           # per department/semester
+BASKETS = 2                # COMBINED elective baskets per department/semester
+BASKET_MEMBERS = (3, 5)    # parallel courses per basket
+COURSES_PER_FACULTY = 3    # average teaching load
+COHORT_SIZES = [45, 60, 70, 84]
+
+RESULT_COLUMNS = ['scale', 'engine', 'seed', 'courses', 'rooms', 'faculty', 'sessions', 'placed', 'success_rate',
+                  'load_s', 'schedule_s', 'export_s', 'peak_rss_mb']
+TIMED_PHASES = ['load_s', 'schedule_s', 'export_s']
+
+def generate_institution(directory, scale, seed=0, courses_per_faculty=COURSES_PER_FACULTY):
+    # Write courses.csv, rooms.csv, faculty.csv and electives.csv for `scale` blocks.
+    # The same (scale, seed) always produces the same files.
+    rng = random.Random(f"{seed}/{scale}")
+    courses, rooms, faculty, electives = [], [], [], []
+    block_faculty = -(-len(BLOCK_DEPARTMENTS) * len(BLOCK_SEMESTERS)
+                      * (CORE_COURSES + BASKETS * BASKET_MEMBERS[1]) // courses_per_faculty)
+    for block in range(scale):
+        suffix = str(block + 1) if block else ''
+        fids = [str(block * block_faculty + n + 1) for n in range(block_faculty)]
+        faculty += [(fid, f"Dr. Faculty {fid}") for fid in fids]
+        for capacity, room_type in BLOCK_ROOMS:
+            room_id = len(rooms) + 1
+            prefix = 'L' if room_type.endswith('_LAB') else 'C'
+            rooms.append((room_id, f"{prefix}{room_id:04d}", capacity, room_type))
+
+        for department in BLOCK_DEPARTMENTS:
+            for semester in BLOCK_SEMESTERS:
+                cohort = rng.choice(COHORT_SIZES)
+                for n in range(CORE_COURSES):
+                    code = f"{department}{suffix}{semester}{n:02d}"
+                    courses.append((department + suffix, semester, code, f"Course {code}", rng.choice([2, 3]),
+                                    rng.choice([0, 1]), rng.choice([0, 0, 2]), rng.choice(fids), 'FALSE', cohort))
+                for _ in range(BASKETS):
+                    # Basket codes are unique, so every department/semester gets its own baskets
+                    basket = f"B{len(courses) + 1}"
+                    members = [(f"Elective {department}{suffix}-{semester}-{basket}-{m}", rng.choice(fids))
+                               for m in range(rng.randint(*BASKET_MEMBERS))]
+                    electives += [(basket, name, fid, f"Dr. Faculty {fid}", semester) for name, fid in members]
+                    courses.append((department + suffix, semester, basket, '/'.join(name for name, _ in members),
+                                    3, 1, 0, ';'.join(fid for _, fid in members), 'TRUE', cohort))
+
+    def write(name, header, rows):
+        with open(os.path.join(directory, name), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    write('courses.csv', tg.COURSE_COLUMNS[:8] + ['S', 'C', 'SEMESTER_TYPE'] + tg.COURSE_COLUMNS[8:],
+          [(n + 1, department, semester, code, name, l, t, p, 0, l + t + p // 2, 'even', fid, combined, capacity)
+           for n, (department, semester, code, name, l, t, p, fid, combined, capacity) in enumerate(courses)])
+    write('rooms.csv', tg.ROOM_COLUMNS, rooms)
+    write('faculty.csv', tg.FACULTY_COLUMNS, faculty)
+    write('electives.csv', ['elective', 'elective_name', 'faculty_id', 'faculty_name', 'semester'], electives)
+    return {'courses': len(courses), 'rooms': len(rooms), 'faculty': len(faculty)}
+
+def peak_rss_mb():
+    # High-water resident set size of this process, or None where `resource` is unavailable
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == 'darwin' else 2**10), 1)
+
+def run_case(directory, engine, seed):
+    # One load -> schedule -> export pass; runs in a fresh process so peak memory is its own.
+    # pandas and openpyxl are imported up front so the phases time warm work only.
+    importlib.import_module('pandas')
+    importlib.import_module('openpyxl')
+    tg.logger.setLevel(logging.WARNING)
+    paths = {kind: os.path.join(directory, path) for kind, path in tg.INPUT_PATHS.items()}
+    paths['calendar'] = None  # always the built-in week, so results stay comparable
+    timings = {}
+    start = perf_counter()
+    inputs = tg.load_inputs(paths)
+    timings['load_s'] = perf_counter() - start
+    start = perf_counter()
+    result = tg.schedule(inputs, {'engine': engine, 'seed': seed, 'workers': 1})
+    timings['schedule_s'] = perf_counter() - start
+    start = perf_counter()
+    with tempfile.TemporaryDirectory() as output:
+        tg.export(result, os.path.join(output, 'timetables.xlsx'),
+                  state_path=os.path.join(output, tg.STATE_PATH))
+    timings['export_s'] = perf_counter() - start
+    summary = tg.run_summary(result)
+    sessions = summary['placed'] + summary['unplaced']
+    row = {'sessions': sessions, 'placed': summary['placed'],
+           'success_rate': round(summary['placed'] / sessions, 4) if sessions else 1.0,
+           'peak_rss_mb': peak_rss_mb()}
+    row.update((phase, round(seconds, 3)) for phase, seconds in timings.items())
+    return row
+
+def run_benchmarks(scales, seeds, engine='greedy'):
+    rows = []
+    spawn = multiprocessing.get_context('spawn')
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as directory:
+            sizes = generate_institution(directory, scale)
+            for seed in seeds:
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                    row = pool.submit(run_case, directory, engine, seed).result()
+                row.update(sizes, scale=scale, engine=engine, seed=seed)
+                print(f"scale {scale:>3} seed {seed}: {row['placed']}/{row['sessions']} placed, "
+                      f"load {row['load_s']:.2f}s, schedule {row['schedule_s']:.2f}s, "
+                      f"export {row['export_s']:.2f}s, peak {row['peak_rss_mb']} MB")
+                rows.append(row)
+    return rows
+
+def compare(rows, baseline_path, tolerance):
+    # Regressions against a previous results file: a phase more than `tolerance` slower
+    # or a lower success rate for the same (scale, engine, seed)
+    with open(baseline_path, newline='') as f:
+        baseline = {(row['scale'], row['engine'], row['seed']): row for row in csv.DictReader(f)}
+    regressions = []
+    for row in rows:
+        old = baseline.get((str(row['scale']), row['engine'], str(row['seed'])))
+        if old is None:
+            continue
+        for phase in TIMED_PHASES:
+            before, after = float(old[phase]), row[phase]
+            change = (after - before) / before if before else 0.0
+            print(f"scale {row['scale']:>3} seed {row['seed']} {phase}: {before:.3f}s -> {after:.3f}s ({change:+.0%})")
+            if change > tolerance:
+                regressions.append(f"scale {row['scale']} seed {row['seed']}: {phase} {change:+.0%}")
+        if row['success_rate'] < float(old['success_rate']):
+            regressions.append(f"scale {row['scale']} seed {row['seed']}: success rate "
+                               f"{float(old['success_rate']):.2%} -> {row['success_rate']:.2%}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time load, schedule and export on synthetic institutions")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10],
+                        help="institution sizes in blocks of 3 departments x 3 semesters (default: 1 10)")
+    parser.add_argument('--seeds', type=int, nargs='+', default=[1, 2, 3], help="scheduling seeds (default: 1 2 3)")
+    parser.add_argument('--engine', choices=sorted(tg.SCHEDULERS), default='greedy')
+    parser.add_argument('--output', default='benchmark_results.csv', help="results file (default: %(default)s)")
+    parser.add_argument('--generate', metavar='DIR',
+                        help="only write the synthetic inputs for the first scale to DIR")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown per phase against --baseline (default: 0.25 = 25%%)")
+    args = parser.parse_args()
+
+    if args.generate:
+        os.makedirs(args.generate, exist_ok=True)
+        print(generate_institution(args.generate, args.scales[0]))
+        sys.exit()
+    rows = run_benchmarks(args.scales, args.seeds, args.engine)
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Results saved to {args.output}")
+    if args.baseline:
+        regressions = compare(rows, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import timetable_generator as tg
+
+def shipped_paths(**overrides):
+    # The input files at the top of the repository, with the built-in calendar
+    paths = {kind: os.path.join(REPO, path) for kind, path in tg.INPUT_PATHS.items()}
+    paths['calendar'] = None
+    paths.update(overrides)
+    return paths
+
+@pytest.fixture(scope='session')
+def inputs():
+    return tg.load_inputs(shipped_paths())
+
+@pytest.fixture(scope='session')
+def result(inputs):
+    # One greedy schedule of the shipped data; tests that change it work on a copy
+    return tg.schedule(inputs, {'seed': 1})
@@ -0,0 +1,58 @@
+import logging
+import os
+
+import timetable_generator as tg
+
+from conftest import shipped_paths
+
+def write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+def test_cache_hit_restores_the_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('terms/odd')
+    write('timetables.xlsx', 'workbook')
+    write('terms/odd/timetables.state.jsonl', 'state')
+    tg.cache_store('cache', 'k1', ['timetables.xlsx', 'terms/odd/timetables.state.jsonl'])
+    os.remove('timetables.xlsx')
+    os.remove('terms/odd/timetables.state.jsonl')
+    assert tg.cache_fetch('cache', 'k1') == ['timetables.xlsx', 'terms/odd/timetables.state.jsonl']
+    with open('terms/odd/timetables.state.jsonl') as f:
+        assert f.read() == 'state'
+    assert tg.cache_fetch('cache', 'missing') is None
+
+def test_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write('out.bin', 'x' * 1000)
+    max_mb = 2500 / 2**20  # room for two entries
+    for n, key in enumerate(('a', 'b')):
+        tg.cache_store('cache', key, ['out.bin'], max_mb)
+        os.utime(os.path.join('cache', key), (n, n))
+    assert tg.cache_fetch('cache', 'a')  # now more recent than b
+    tg.cache_store('cache', 'c', ['out.bin'], max_mb)
+    assert sorted(os.listdir('cache')) == ['a', 'c']
+
+def test_cache_key_follows_inputs_and_options(inputs):
+    config = dict(tg.DEFAULT_CONFIG, seed=1)
+    key = tg.cache_key(inputs, config, 'excel', False)
+    assert key == tg.cache_key(inputs, dict(config, workers=8), 'excel', False)
+    assert key != tg.cache_key(inputs, dict(config, seed=2), 'excel', False)
+    assert key != tg.cache_key(inputs, config, 'csv', False)
+    assert key != tg.cache_key(inputs, config, 'excel', True)
+
+def test_multi_start_runs_are_cached_under_their_own_seed(tmp_path, monkeypatch, caplog):
+    # The winning start's seed must not become the key: --seed 7 --starts 3 is not the
+    # run --seed 5 --starts 3 happened to win with
+    monkeypatch.chdir(tmp_path)
+    options = {'starts': 3, 'workers': 1, 'views': 'none', 'cache': 'cache'}
+    caplog.set_level(logging.INFO, logger=tg.logger.name)
+    tg.generate_all_timetables(seed=5, paths=shipped_paths(), **options)
+    assert 'Cache hit' not in caplog.text
+    tg.generate_all_timetables(seed=5, paths=shipped_paths(), **options)
+    assert 'Cache hit' in caplog.text
+    caplog.clear()
+    tg.generate_all_timetables(seed=7, paths=shipped_paths(), **options)
+    assert 'Cache hit' not in caplog.text
+    expected = tg.multi_start(tg.load_inputs(shipped_paths()), 3, seed=7, workers=1)
+    assert tg.load_state()['header']['seed'] == expected['seed']
@@ -0,0 +1,43 @@
+import json
+import logging
+
+import timetable_generator as tg
+import validate_timetable as vt
+
+from conftest import shipped_paths
+
+def test_slot_minutes_must_divide_session_lengths():
+    assert tg.calendar_errors({'slot_minutes': 30}, 'calendar.json') == []
+    assert tg.calendar_errors({'slot_minutes': 15}, 'calendar.json') == []
+    errors = tg.calendar_errors({'slot_minutes': 60}, 'calendar.json')
+    assert len(errors) == 1 and 'divide' in errors[0]
+
+def test_session_lengths_follow_the_slot_length(tmp_path):
+    path = tmp_path / 'calendar.json'
+    path.write_text(json.dumps({'slot_minutes': 15}))
+    inputs = tg.load_inputs(shipped_paths(calendar=str(path)))
+    assert inputs['calendar']['durations'] == {'LEC': 6, 'TUT': 4, 'LAB': 8}
+    result = tg.schedule(inputs, {'seed': 1})
+    placed = [(request, placement) for group in result['groups'] for request, placement, _ in group['results']
+              if placement]
+    assert placed
+    assert all(request['duration'] == inputs['calendar']['durations'][request['type']] for request, _ in placed)
+    tg.save_state(result, str(tmp_path / 'state.jsonl'))
+    sessions, calendar, groups = vt.sessions_from_state(tg.load_state(str(tmp_path / 'state.jsonl')))
+    violations = vt.validate(sessions, calendar, groups)
+    assert not [message for check, message in violations if check in ('break', 'section overlap', 'room clash',
+                                                                      'faculty clash')]
+
+def test_incremental_run_keeps_nothing_after_a_calendar_change(inputs, result, tmp_path, caplog):
+    # Slot indices are clock times only under the calendar they were placed with
+    path = str(tmp_path / 'state.jsonl')
+    tg.save_state(result, path)
+    caplog.set_level(logging.INFO, logger=tg.logger.name)
+    placed = sum(1 for group in result['groups'] for _, placement, _ in group['results'] if placement)
+    tg.schedule(inputs, {'seed': 1, 'previous': tg.load_state(path)})
+    assert f"kept {placed} sessions" in caplog.text
+    caplog.clear()
+    calendar = tmp_path / 'calendar.json'
+    calendar.write_text(json.dumps({'start': '08:00'}))
+    tg.schedule(tg.load_inputs(shipped_paths(calendar=str(calendar))), {'seed': 1, 'previous': tg.load_state(path)})
+    assert 'kept 0 sessions' in caplog.text
@@ -0,0 +1,30 @@
+import timetable_generator as tg
+
+from conftest import shipped_paths
+
+def test_backtracking_stops_cleanly_at_a_tiny_time_limit(inputs):
+    # The deadline can pass before the search reaches its first complete assignment
+    result = tg.schedule(inputs, {'engine': 'backtrack', 'time_limit': 0.01, 'seed': 2})
+    results = [entry for group in result['groups'] for entry in group['results']]
+    assert results and all(placement or reason for _, placement, reason in results)
+
+COURSES = """COURSE_ID,DEPARTMENT,SEMESTER,COURSE_CODE,COURSE_NAME,L,T,P,S,C,SEMESTER_TYPE,FACULTY_ID,COMBINED,CAPACITY
+1,CSE,2,CS101,Programming Lab,0,0,2,0,1,even,1,FALSE,60
+2,CSE,2,CS102,Hardware Lab,0,0,2,0,1,even,2,FALSE,40
+3,ECE,2,EC101,Signals,3,1,0,0,4,even,3,FALSE,70
+4,ECE,2,EC102,Circuits,2,1,0,0,3,even,4,FALSE,70
+5,DSAI,2,DS101,Statistics,3,0,0,0,3,even,5,FALSE,50
+"""
+
+def test_parallel_components_match_a_serial_run(tmp_path):
+    # CSE uses only labs and the other groups only lecture rooms, with their own faculty,
+    # so CSE is independent of ECE and DSAI (which share the lecture rooms)
+    (tmp_path / 'courses.csv').write_text(COURSES)
+    inputs = tg.load_inputs(shipped_paths(courses=str(tmp_path / 'courses.csv')))
+    assert len(tg.partition_groups(tg.plan_groups(inputs), inputs)) == 2
+    serial = tg.schedule(inputs, {'seed': 3, 'workers': 1})
+    parallel = tg.schedule(inputs, {'seed': 3, 'workers': 2})
+    assert serial['components'] == parallel['components'] == 2
+    assert ([[placement for _, placement, _ in group['results']] for group in serial['groups']]
+            == [[placement for _, placement, _ in group['results']] for group in parallel['groups']])
+    assert serial['occupancy'] == parallel['occupancy']
@@ -0,0 +1,43 @@
+import csv
+
+import timetable_generator as tg
+
+from conftest import shipped_paths
+
+# The busiest lecturers of the shipped data, each given limits that bind
+LIMITS = {'30': ('Monday; Friday 14:00-18:30', 3, 3), '12': ('Tuesday 09:00-13:00', 4, ''),
+          '29': ('', 3, 4), '32': ('Wednesday', '', 3)}
+
+def teaching_masks(result):
+    # {(fid, day): slots taught}; a basket session is listed once per group, which OR ignores
+    masks = {}
+    for group in result['groups']:
+        for request, placement, _ in group['results']:
+            if placement:
+                day, start_slot, _ = placement
+                for fid in request['faculty_ids']:
+                    masks[fid, day] = masks.get((fid, day), 0) | tg.window_mask(start_slot, request['duration'])
+    return masks
+
+def test_placements_keep_faculty_availability_and_load(tmp_path):
+    with open(shipped_paths()['faculty'], newline='') as f:
+        rows = list(csv.reader(f))
+    rows[0] += ['unavailable', 'max_hours_per_day', 'max_consecutive_slots']
+    for row in rows[1:]:
+        row += LIMITS.get(row[0], ('', '', ''))
+    with open(tmp_path / 'faculty.csv', 'w', newline='') as f:
+        csv.writer(f).writerows(rows)
+    inputs = tg.load_inputs(shipped_paths(faculty=str(tmp_path / 'faculty.csv')))
+    limits = inputs['faculty_limits']
+    assert sorted(limits) == sorted(LIMITS)
+    for seed in (1, 2, 3):
+        for config in ({'seed': seed}, {'seed': seed, 'improve': 60, 'improve_moves': 2000}):
+            for (fid, day), mask in teaching_masks(tg.schedule(inputs, config)).items():
+                if fid not in limits:
+                    continue
+                assert not mask & limits[fid]['unavailable'][day]
+                if limits[fid]['max_slots'] is not None:
+                    assert bin(mask).count('1') <= limits[fid]['max_slots']
+                if limits[fid]['max_run'] is not None:
+                    assert all(tg.run_length(mask, slot) <= limits[fid]['max_run']
+                               for slot in range(mask.bit_length()) if mask >> slot & 1)
@@ -0,0 +1,37 @@
+import timetable_generator as tg
+import validate_timetable as vt
+
+def unmet(result):
+    missing = [request['duration'] for group in result['groups'] for request, placement, _ in group['results']
+               if placement is None]
+    return len(missing), sum(missing)
+
+def test_spread_days_count_sessions_of_the_same_type():
+    state = {'calendar': tg.build_calendar(),
+             'section_timetables': {'A': {'course_days': {(7, 'TUT'): {0}, (7, 'LEC'): {2}}}}}
+    lecture = {'course_id': 7, 'type': 'LEC', 'days': 'spread', 'sections': ['A']}
+    assert tg.allowed_days(lecture, state) == [0, 1, 3, 4]
+    state['section_timetables']['A']['course_days'][(7, 'LEC')].add(4)
+    assert tg.allowed_days(lecture, state) == []
+
+def test_local_search_never_leaves_more_unmet(inputs):
+    for seed in (1, 2, 3):
+        result = tg.schedule(inputs, {'seed': seed})
+        before = unmet(result)
+        tg.improve_schedule(result, inputs, time_limit=60, max_moves=3000, seed=seed)
+        after = unmet(result)
+        assert after[0] <= before[0] and after[1] <= before[1]
+
+def test_local_search_keeps_hard_constraints(inputs, tmp_path):
+    result = tg.schedule(inputs, {'seed': 4, 'improve': 60, 'improve_moves': 3000})
+    tg.save_state(result, str(tmp_path / 'state.jsonl'))
+    violations = vt.validate(*vt.sessions_from_state(tg.load_state(str(tmp_path / 'state.jsonl'))))
+    assert not [message for check, message in violations
+                if check in ('room clash', 'faculty clash', 'section overlap', 'break', 'room type')]
+
+def test_improved_multi_start_reruns_from_its_seed(inputs):
+    def placements(result):
+        return [[placement for _, placement, _ in group['results']] for group in result['groups']]
+    best = tg.schedule(inputs, {'seed': 5, 'starts': 3, 'workers': 1, 'improve_moves': 1000})
+    again = tg.schedule(inputs, {'seed': best['seed'], 'improve_moves': 1000})
+    assert placements(again) == placements(best)
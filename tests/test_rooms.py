@@ -0,0 +1,44 @@
+import timetable_generator as tg
+import validate_timetable as vt
+
+def test_large_courses_never_get_smaller_rooms(inputs):
+    for capacity in (80, 151, 201):
+        rooms = tg.suitable_rooms(inputs, capacity, False)
+        assert rooms and all(room[2] >= max(capacity, tg.LARGE_ROOM_CAPACITY) for room in rooms)
+
+def test_schedules_fit_their_rooms_and_faculty(inputs, tmp_path):
+    # Seed 2 used to put 201 students of HS205 in a 120-seat room
+    for seed in (1, 2, 3):
+        tg.save_state(tg.schedule(inputs, {'seed': seed}), str(tmp_path / 'state.jsonl'))
+        violations = vt.validate(*vt.sessions_from_state(tg.load_state(str(tmp_path / 'state.jsonl'))))
+        assert not [message for check, message in violations if check in ('capacity', 'faculty clash')]
+
+def test_basket_books_the_course_row_faculty(inputs):
+    baskets = tg.plan_baskets(inputs)
+    b1 = [basket for (department, semester, _), basket in baskets.items() if (department, semester) == ('CSE', '6A')
+          and basket['id'].startswith('B1 ')]
+    assert b1 and '20' in b1[0]['faculty_ids']
+    assert any('FACULTY_ID 20 of B1 (CSE 6A)' in warning for warning in inputs['warnings'])
+
+def test_basket_cells_list_every_member_room(inputs):
+    calendar = tg.build_calendar()
+    state = {'calendar': calendar, 'occupancy': tg.new_occupancy(), 'group': ('CSE', '6A'),
+             'section_timetables': {section: {'timetable': tg.empty_timetable(calendar), 'course_days': {}}
+                                    for section in ('A', 'B')}}
+    rooms = list(inputs['rooms_by_id'].values())[:2]
+    request = tg.session_request(1, 'B1', 'Elective', [], '', 'LEC', 3, 40, False, 2, ['A', 'B'], 'any')
+    request['basket'] = 'B1 6'
+    tg.commit_session(request, state, 0, 0, rooms)
+    expected = '/'.join(room[1] for room in rooms)
+    assert [state['section_timetables'][section]['timetable'][0][0]['classroom'] for section in ('A', 'B')] \
+        == [expected, expected]
+
+def test_room_slot_index_matches_the_room_masks(inputs, result):
+    occupancy = result['occupancy']
+    masks_only = {kind: occupancy[kind] for kind in tg.OCCUPANCY_KINDS}
+    calendar = result['calendar']
+    for candidates in inputs['room_index'].values():
+        for day in range(len(calendar['days'])):
+            for start in range(len(calendar['slots']) - 1):
+                assert tg.free_rooms(candidates, occupancy, day, start, 2) \
+                    == tg.free_rooms(candidates, masks_only, day, start, 2)
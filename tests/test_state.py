@@ -0,0 +1,25 @@
+import pytest
+
+import timetable_generator as tg
+
+def test_state_round_trip(result, tmp_path):
+    first, second = str(tmp_path / 'first.jsonl'), str(tmp_path / 'second.jsonl')
+    tg.save_state(result, first)
+    rebuilt = tg.result_from_state(tg.load_state(first))
+    assert rebuilt['seed'] == result['seed']
+    assert rebuilt['occupancy']['room'] == {room_id: masks for room_id, masks in result['occupancy']['room'].items()
+                                            if any(masks)}
+    assert rebuilt['occupancy']['section'] == result['occupancy']['section']
+    for old, new in zip(result['groups'], rebuilt['groups']):
+        assert [placement for _, placement, _ in old['results']] == [placement for _, placement, _ in new['results']]
+        for section, timetable in old['section_timetables'].items():
+            assert new['section_timetables'][section]['timetable'] == timetable['timetable']
+    tg.save_state(rebuilt, second)
+    with open(first) as f, open(second) as g:
+        assert f.read().splitlines()[1:] == g.read().splitlines()[1:]
+
+def test_state_rejects_other_files(tmp_path):
+    path = tmp_path / 'other.jsonl'
+    path.write_text('{"format": "something-else"}\n')
+    with pytest.raises(ValueError, match='schedule state'):
+        tg.load_state(str(path))
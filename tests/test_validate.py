@@ -0,0 +1,37 @@
+import os
+
+import timetable_generator as tg
+import validate_timetable as vt
+
+from conftest import REPO
+
+def session(code, session_type, day, start_slot, duration):
+    return {'group': ('CSE', '4A'), 'sections': ['A'], 'code': code, 'type': session_type, 'day': day,
+            'start_slot': start_slot, 'duration': duration, 'is_lab': session_type == 'LAB',
+            'rooms': [(1, 'C101', 75, 'LECTURE_ROOM' if session_type != 'LAB' else 'COMPUTER_LAB')], 'seats': [60],
+            'faculty_ids': ['1'], 'joint': None}
+
+def test_unmet_sessions_follow_the_scheduler_counts():
+    # L=3 makes three lectures, T=1 one tutorial, and P=2 a single lab
+    calendar = tg.build_calendar()
+    courses = {('CSE', '4A', 'CS261'): {'L': '3', 'T': '1', 'P': '2', 'COMBINED': 'FALSE'}}
+    sessions = [session('CS261', 'LEC', day, 0, 3) for day in range(3)]
+    sessions += [session('CS261', 'TUT', 3, 0, 2), session('CS261', 'LAB', 4, 10, 4)]
+    assert vt.validate(sessions, calendar, {('CSE', '4A'): ['A']}, courses) == []
+    violations = vt.validate(sessions[1:], calendar, {('CSE', '4A'): ['A']}, courses)
+    assert violations == [('unmet sessions', "CS261 (CSE 4A A): 2 of 3 lecture sessions")]
+
+def test_workbook_checks_single_room_baskets(result, tmp_path):
+    # HS205 is one combined course over three groups, seated in one room for all of them
+    path = str(tmp_path / 'timetables.xlsx')
+    tg.write_workbook(result, path, views='none')
+    courses = vt.course_table(vt.read_csv_rows(os.path.join(REPO, 'courses.csv')))
+    rooms = vt.read_csv_rows(os.path.join(REPO, 'rooms.csv'))
+    sessions, calendar, groups = vt.sessions_from_workbook(path, courses, rooms)
+    assert not [message for check, message in vt.validate(sessions, calendar, groups) if check == 'capacity']
+    for key, row in courses.items():
+        if key[2] == 'HS205':
+            row['CAPACITY'] = '100'
+    sessions, calendar, groups = vt.sessions_from_workbook(path, courses, rooms)
+    overfull = [message for check, message in vt.validate(sessions, calendar, groups) if check == 'capacity']
+    assert overfull and all(message.startswith('HS205') and 'puts 300 students' in message for message in overfull)
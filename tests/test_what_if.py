@@ -0,0 +1,85 @@
+import copy
+
+import pytest
+
+import timetable_generator as tg
+
+def lectures(result):
+    # (group, request, placement) of every placed core lecture
+    return [(group, request, placement) for group in result['groups'] for request, placement, _ in group['results']
+            if placement and request['type'] == 'LEC' and not request.get('basket')]
+
+def pin(group, request, day, start_slot, calendar, **extra):
+    return dict({'edit': 'pin', 'department': group['department'], 'semester': group['semester'],
+                 'code': request['code'], 'type': request['type'], 'section': request['sections'][0],
+                 'day': calendar['days'][day], 'start': tg.minutes_label(calendar['slots'][start_slot][0])}, **extra)
+
+@pytest.fixture
+def sandbox(result, inputs):
+    return tg.open_sandbox(result, inputs)
+
+def test_bad_edits_are_reported(sandbox):
+    report = tg.what_if(sandbox, [{'edit': 'swap'}, {'edit': 'block_room', 'room': 'Z999'},
+                                  {'edit': 'pin', 'department': 'CSE', 'semester': '4A', 'code': 'XX000',
+                                   'day': 'Monday', 'start': '09:00'}])
+    assert not report['feasible']
+    assert [error.split()[0:2] for error in report['errors']] == [['unknown', 'edit'], ['unknown', 'room'],
+                                                                  ['no', 'placed']]
+
+def test_what_if_leaves_the_baseline_alone(result, sandbox):
+    occupancy = copy.deepcopy(result['occupancy'])
+    tg.what_if(sandbox, [{'edit': 'block_room', 'room': 'C004'}])
+    assert result['occupancy'] == occupancy
+
+def test_pin_after_its_room_is_blocked(result, sandbox):
+    # The pinned session was displaced by the block first; it must be pinned, not re-placed
+    group, request, (day, start_slot, rooms) = lectures(result)[0]
+    report = tg.what_if(sandbox, [{'edit': 'block_room', 'room': rooms[0][1]},
+                                  pin(group, request, day, start_slot, result['calendar'])])
+    assert len(report['pinned']) == 1
+    moved = report['pinned'][0]
+    assert moved['from']['rooms'] == [room[1] for room in rooms]
+    if moved['to']:
+        assert rooms[0][1] not in moved['to']['rooms']
+    else:
+        assert any('blocked' in error for error in report['errors'])
+    assert not [entry for entry in report['displaced']
+                if (entry['code'], entry['type'], entry['groups'], entry['from'])
+                == (moved['code'], moved['type'], moved['groups'], moved['from'])]
+
+def test_lecture_may_move_to_its_tutorial_day(result, sandbox):
+    calendar = result['calendar']
+    for group, request, (day, start_slot, _) in lectures(result):
+        timetables = group['section_timetables']
+        days = timetables[request['sections'][0]]['course_days']
+        free = sorted(days.get((request['course_id'], 'TUT'), set()) - days.get((request['course_id'], 'LEC'), set()))
+        if free:
+            report = tg.what_if(sandbox, [pin(group, request, free[0], start_slot, calendar)])
+            assert not [error for error in report['errors'] if 'allowed days' in error]
+            return
+    pytest.skip("no lecture with a tutorial on another day")
+
+def test_pin_respects_faculty_hours(result, inputs):
+    calendar = result['calendar']
+    busy = {}
+    for group, request, (day, start_slot, _) in lectures(result):
+        for fid in request['faculty_ids']:
+            busy.setdefault((fid, day), []).append((group, request, start_slot))
+    # A lecturer with two lectures on one day may only teach one lecture's worth per day
+    (fid, day), sessions = next(item for item in busy.items() if len(item[1]) >= 2)
+    limits = {fid: {'unavailable': [0] * len(calendar['days']), 'max_slots': calendar['durations']['LEC'],
+                    'max_run': None}}
+    sandbox = tg.open_sandbox(result, dict(inputs, faculty_limits=limits))
+    group, request, start_slot = sessions[0]
+    report = tg.what_if(sandbox, [pin(group, request, day, start_slot, calendar)])
+    assert any('hours per day' in error for error in report['errors'])
+    assert not report['displaced']
+
+def test_pin_session_numbers_may_be_strings(result, sandbox):
+    group, request, (day, start_slot, _) = lectures(result)[0]
+    calendar = result['calendar']
+    report = tg.what_if(sandbox, [pin(group, request, day, start_slot, calendar, session='1')])
+    assert len(report['pinned']) == 1 and not report['errors']
+    report = tg.what_if(sandbox, [pin(group, request, day, start_slot, calendar, session=session)
+                                  for session in ('first', None)])
+    assert [error.split()[0:2] for error in report['errors']] == [['bad', 'pin'], ['bad', 'pin']]
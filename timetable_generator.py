@@ -1,608 +1,2709 @@
-import pandas as pd
+import argparse
+import csv
+import json
+import logging
+import math
+import os
 import random
-from datetime import datetime, time, timedelta
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Border, Side, Alignment, Font
-from openpyxl.utils import get_column_letter
+import re
+from collections import namedtuple
+from bisect import bisect_left
+from itertools import accumulate
+from concurrent.futures import ProcessPoolExecutor
+from time import monotonic, perf_counter
+
+# pandas and openpyxl are imported where they are used, so importing this module
+# reads no files and pulls in neither: load_inputs() -> schedule() -> export()
+
+# Progress goes to this logger; only the command line configures handlers (configure_logging)
+logger = logging.getLogger('timetable_generator')
 
 # Constants
 DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-START_TIME = time(9, 0)
-END_TIME = time(18, 30)
+START_TIME = '09:00'
+END_TIME = '18:30'
 TIME_SLOT_DURATION = 30  # minutes (REQ-02)
-LECTURE_DURATION = 3    # 1.5 hours = 3 slots
-TUTORIAL_DURATION = 2   # 1 hour = 2 slots
-LAB_DURATION = 4       # 2 hours = 4 slots
-MORNING_BREAK = (time(10, 30), time(11, 0))  # 30 min
-LUNCH_BREAK = (time(13, 0), time(14, 0))     # 1 hour
-AFTERNOON_BREAK = (time(16, 30), time(17, 0))  # 30 min
-
-def generate_time_slots():
-    slots = []
-    current_time = datetime.combine(datetime.today(), START_TIME)
-    end_time = datetime.combine(datetime.today(), END_TIME)
-    
-    while current_time < end_time:
-        current = current_time.time()
-        next_time = current_time + timedelta(minutes=TIME_SLOT_DURATION)
-        slots.append((current, next_time.time()))
-        current_time = next_time
-    return slots
-
-def is_break_time(slot):
-    start, _ = slot
-    morning_break = MORNING_BREAK[0] <= start < MORNING_BREAK[1]
-    lunch_break = LUNCH_BREAK[0] <= start < LUNCH_BREAK[1]
-    afternoon_break = AFTERNOON_BREAK[0] <= start < AFTERNOON_BREAK[1]
-    return morning_break or lunch_break or afternoon_break
-
-# Load data from three CSV files (REQ-02)
-try:
-    courses_df = pd.read_csv('courses.csv')
-    electives_df = pd.read_csv('electives.csv')
-    rooms_df = pd.read_csv('rooms.csv')
-    print("Courses columns:", courses_df.columns.tolist())
-    print("Electives columns:", electives_df.columns.tolist())
-    print("Rooms columns:", rooms_df.columns.tolist())
-except FileNotFoundError as e:
-    print(f"Error: File {e.filename} not found")
-    exit()
-
-# Create faculty name mapping for electives
-faculty_map = {}
-for _, row in electives_df.iterrows():
-    faculty_ids = str(row['faculty_id']).split(';')
-    faculty_names = str(row['faculty_name']).split(';')
-    for fid, fname in zip(faculty_ids, faculty_names):
-        faculty_map[fid] = fname.strip()
-
-def get_faculty_name(faculty_ids, course_code):
-    if pd.isna(faculty_ids):
+# Session lengths in minutes; the calendar turns them into slots for its slot length
+SESSION_MINUTES = {'LEC': 90,   # 1.5 hours
+                   'TUT': 60,   # 1 hour
+                   'LAB': 120}  # 2 hours
+BREAKS = [('10:30', '11:00'),   # morning, 30 min
+          ('13:00', '14:00'),   # lunch, 1 hour
+          ('16:30', '17:00')]   # afternoon, 30 min
+
+# The week is described once by a calendar; calendar.json (same keys) overrides any of them
+CALENDAR_PATH = "calendar.json"
+DEFAULT_CALENDAR = {'days': DAYS, 'start': START_TIME, 'end': END_TIME, 'slot_minutes': TIME_SLOT_DURATION,
+                    'breaks': BREAKS}
+
+def parse_minutes(text):
+    # 'HH:MM' -> minutes after midnight
+    hours, minutes = str(text).split(':')
+    if not (0 <= int(hours) < 24 and 0 <= int(minutes) < 60):
+        raise ValueError(text)
+    return int(hours) * 60 + int(minutes)
+
+def minutes_label(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def calendar_errors(config, filename):
+    errors = []
+    unknown = set(config) - set(DEFAULT_CALENDAR)
+    if unknown:
+        errors.append(f"{filename}: unknown key(s) {', '.join(sorted(unknown))}")
+    config = dict(DEFAULT_CALENDAR, **config)
+    days = config['days']
+    if not isinstance(days, list) or not 1 <= len(days) <= 7 or len(set(map(str, days))) != len(days):
+        errors.append(f"{filename}: days must list 1 to 7 distinct day names")
+    try:
+        start, end = parse_minutes(config['start']), parse_minutes(config['end'])
+        breaks = [(parse_minutes(a), parse_minutes(b)) for a, b in config['breaks']]
+    except (TypeError, ValueError):
+        return errors + [f"{filename}: start, end and breaks must be HH:MM times (breaks as [start, end] pairs)"]
+    if not isinstance(config['slot_minutes'], int) or config['slot_minutes'] <= 0:
+        errors.append(f"{filename}: slot_minutes must be a positive whole number")
+    elif any(minutes % config['slot_minutes'] for minutes in SESSION_MINUTES.values()):
+        errors.append(f"{filename}: slot_minutes must divide the session lengths "
+                      f"({', '.join(str(minutes) for minutes in SESSION_MINUTES.values())} minutes)")
+    elif end - start < max(SESSION_MINUTES.values()):
+        errors.append(f"{filename}: the day from {config['start']} to {config['end']} is shorter than a lab")
+    errors += [f"{filename}: break {minutes_label(a)}-{minutes_label(b)} ends before it starts"
+               for a, b in breaks if b <= a]
+    return errors
+
+def build_calendar(config=None):
+    # Everything the scheduler and exporters need about the week, computed once so no
+    # check touches clock times: slot i is slots[i] (minutes after midnight), bit i of
+    # break_mask marks a break slot, durations[type] is the length of a session in slots,
+    # and starts[duration] has bit s set when the window of that many slots from s avoids
+    # every break.
+    config = dict(DEFAULT_CALENDAR, **(config or {}))
+    start, end, step = parse_minutes(config['start']), parse_minutes(config['end']), config['slot_minutes']
+    slots = [(minute, minute + step) for minute in range(start, end, step)]
+    breaks = [(parse_minutes(a), parse_minutes(b)) for a, b in config['breaks']]
+    break_slots = {idx for idx, (minute, _) in enumerate(slots) if any(a <= minute < b for a, b in breaks)}
+    break_mask = sum(1 << idx for idx in break_slots)
+    durations = {session_type: minutes // step for session_type, minutes in SESSION_MINUTES.items()}
+    return {'config': {'days': list(config['days']), 'start': config['start'], 'end': config['end'],
+                       'slot_minutes': step, 'breaks': [list(pair) for pair in config['breaks']]},
+            'days': [str(day) for day in config['days']], 'slots': slots,
+            'labels': [f"{minutes_label(a)}-{minutes_label(b)}" for a, b in slots],
+            'break_slots': break_slots, 'break_mask': break_mask,
+            'teaching_slots': len(slots) - len(break_slots),
+            'durations': durations,
+            'starts': {duration: free_window_starts(break_mask, duration, len(slots))
+                       for duration in durations.values()}}
+
+def load_calendar(path, errors):
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except ValueError as e:
+        errors.append(f"{path}: not valid JSON ({e})")
+        return None
+    if not isinstance(config, dict):
+        errors.append(f"{path}: expected a JSON object")
+        return None
+    errors += calendar_errors(config, path)
+    return config
+
+LAB_ROOM_TYPES = ('COMPUTER_LAB', 'HARDWARE_LAB')
+LECTURE_ROOM_TYPES = ('LECTURE_ROOM', 'SEATER_120', 'SEATER_240')
+
+# Input records, built once by load_inputs(); the scheduler never touches pandas
+Course = namedtuple('Course', ['course_id', 'department', 'semester', 'semester_number', 'code', 'name',
+                               'l', 't', 'p', 'faculty_ids', 'combined', 'capacity', 'semester_type'])
+COURSE_COLUMNS = ['COURSE_ID', 'DEPARTMENT', 'SEMESTER', 'COURSE_CODE', 'COURSE_NAME', 'L', 'T', 'P',
+                  'FACULTY_ID', 'COMBINED', 'CAPACITY']
+ROOM_COLUMNS = ['id', 'room no', 'capacity', 'room type']
+FACULTY_COLUMNS = ['faculty_id', 'faculty_name']
+
+def missing_columns(df, columns, filename, errors):
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        errors.append(f"{filename}: missing column(s) {', '.join(missing)}")
+    return bool(missing)
+
+def numeric_column(df, column, filename, errors, required=True):
+    # Parse a whole column at once and report every non-numeric (or missing, if required) cell
+    import pandas as pd
+    values = pd.to_numeric(df[column], errors='coerce')
+    bad = values.isna() & (df[column].notna() | required)
+    for line, raw in zip(df.index[bad] + 2, df[column][bad]):
+        errors.append(f"{filename} line {line}: {column} {raw!r} is not a number")
+    return values
+
+def faculty_id_text(value):
+    # 12, 12.0 and '12' all name faculty '12'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def load_faculty_names(faculty_df, electives_df, errors):
+    # faculty.csv is authoritative; names from electives.csv fill in ids it does not list
+    import pandas as pd
+    names = {}
+    if not missing_columns(electives_df, FACULTY_COLUMNS, 'electives.csv', errors):
+        for fids, fnames in zip(electives_df['faculty_id'].astype(str), electives_df['faculty_name'].astype(str)):
+            for fid, fname in zip(fids.split(';'), fnames.split(';')):
+                names[fid.strip()] = fname.strip()
+    if not missing_columns(faculty_df, FACULTY_COLUMNS, 'faculty.csv', errors):
+        ids = numeric_column(faculty_df, 'faculty_id', 'faculty.csv', errors)
+        names.update((str(int(fid)), str(fname).strip())
+                     for fid, fname in zip(ids, faculty_df['faculty_name']) if pd.notna(fid))
+    return names
+
+FACULTY_LIMIT_COLUMNS = ['unavailable', 'max_hours_per_day', 'max_consecutive_slots']  # optional
+
+def parse_unavailable(text, calendar):
+    # 'Monday; Friday 14:00-18:30' -> [slot mask per day], or a message for the first bad entry
+    masks = [0] * len(calendar['days'])
+    for entry in text.split(';'):
+        parts = entry.split()
+        if not parts:
+            continue
+        if parts[0] not in calendar['days'] or len(parts) > 2:
+            return f"{entry.strip()!r} is not 'Day' or 'Day HH:MM-HH:MM'"
+        day = calendar['days'].index(parts[0])
+        start, end = 0, 24 * 60
+        if len(parts) == 2:
+            try:
+                start, end = (parse_minutes(time) for time in parts[1].split('-'))
+            except ValueError:
+                return f"{entry.strip()!r} is not 'Day' or 'Day HH:MM-HH:MM'"
+            if end <= start:
+                return f"{entry.strip()!r} ends before it starts"
+        masks[day] |= sum(1 << slot for slot, (a, b) in enumerate(calendar['slots']) if a < end and b > start)
+    return masks
+
+def load_faculty_limits(faculty_df, calendar, errors):
+    # Availability and load limits from the optional faculty.csv columns: {fid: {'unavailable':
+    # [slot mask per day], 'max_slots': slots per day or None, 'max_run': consecutive slots
+    # or None}}, for faculty with at least one limit
+    import pandas as pd
+    filename = 'faculty.csv'
+    if 'faculty_id' not in faculty_df.columns or not any(c in faculty_df.columns for c in FACULTY_LIMIT_COLUMNS):
+        return {}
+    ids = pd.to_numeric(faculty_df['faculty_id'], errors='coerce')
+    blank = pd.Series([None] * len(faculty_df), index=faculty_df.index)
+    hours = (numeric_column(faculty_df, 'max_hours_per_day', filename, errors, required=False)
+             if 'max_hours_per_day' in faculty_df.columns else blank)
+    runs = (numeric_column(faculty_df, 'max_consecutive_slots', filename, errors, required=False)
+            if 'max_consecutive_slots' in faculty_df.columns else blank)
+    unavailable = faculty_df['unavailable'] if 'unavailable' in faculty_df.columns else blank
+    limits = {}
+    for line, fid, text, max_hours, max_run in zip(faculty_df.index + 2, ids, unavailable, hours, runs):
+        if pd.isna(fid):
+            continue
+        masks = [0] * len(calendar['days'])
+        if pd.notna(text) and str(text).strip():
+            masks = parse_unavailable(str(text), calendar)
+            if isinstance(masks, str):
+                errors.append(f"{filename} line {line}: unavailable {masks}")
+                continue
+        for column, value in (('max_hours_per_day', max_hours), ('max_consecutive_slots', max_run)):
+            if pd.notna(value) and value <= 0:
+                errors.append(f"{filename} line {line}: {column} must be positive")
+        max_slots = None if pd.isna(max_hours) else int(max_hours * 60 // calendar['config']['slot_minutes'])
+        max_run = None if pd.isna(max_run) else int(max_run)
+        if any(masks) or max_slots is not None or max_run is not None:
+            limits[str(int(fid))] = {'unavailable': masks, 'max_slots': max_slots, 'max_run': max_run}
+    return limits
+
+ELECTIVE_COLUMNS = ['elective', 'elective_name', 'faculty_id', 'semester']
+
+def load_baskets(electives_df, errors):
+    # Elective baskets from electives.csv: {(basket code, semester number): [(course name,
+    # faculty ids), ...]}. The members of a basket run in parallel, one room each.
+    import pandas as pd
+    if missing_columns(electives_df, ELECTIVE_COLUMNS, 'electives.csv', errors):
+        return {}
+    semesters = numeric_column(electives_df, 'semester', 'electives.csv', errors)
+    baskets = {}
+    for code, name, fids, semester in zip(electives_df['elective'], electives_df['elective_name'],
+                                          electives_df['faculty_id'], semesters):
+        if pd.isna(semester):
+            continue
+        parts = [] if pd.isna(fids) else faculty_id_text(fids).split(';')
+        members = baskets.setdefault((str(code).strip(), int(semester)), {})
+        members.setdefault(str(name).strip(), tuple(fid.strip() for fid in parts if fid.strip()))
+    return {key: list(members.items()) for key, members in baskets.items()}
+
+def parse_courses(courses_df, faculty_names, errors, warnings):
+    import pandas as pd
+    filename = 'courses.csv'
+    if missing_columns(courses_df, COURSE_COLUMNS, filename, errors):
+        return []
+    lines = courses_df.index + 2
+    course_ids = numeric_column(courses_df, 'COURSE_ID', filename, errors)
+    capacity = numeric_column(courses_df, 'CAPACITY', filename, errors)
+    # Sections are keyed by COURSE_ID within a department/semester, so ids only need to be
+    # unique there; reuse across groups is reported but allowed
+    group_ids = pd.DataFrame({'department': courses_df['DEPARTMENT'], 'semester': courses_df['SEMESTER'],
+                              'course_id': course_ids})
+    in_group = group_ids.duplicated() & course_ids.notna()
+    across = course_ids.duplicated() & course_ids.notna() & ~in_group
+    for line, course_id in zip(lines[in_group], course_ids[in_group]):
+        errors.append(f"{filename} line {line}: duplicate COURSE_ID {int(course_id)} in the same department/semester")
+    for line, course_id in zip(lines[across], course_ids[across]):
+        warnings.append(f"{filename} line {line}: COURSE_ID {int(course_id)} is also used by another department/semester")
+    hours = {}
+    for column in ('L', 'T', 'P'):
+        values = numeric_column(courses_df, column, filename, errors, required=False).fillna(0)
+        fractional = values % 1 != 0
+        for line, code, value in zip(lines[fractional], courses_df['COURSE_CODE'][fractional], values[fractional]):
+            warnings.append(f"{filename} line {line}: {column}={value:g} for {code} is not a whole number, "
+                            f"scheduling {int(value)}")
+        hours[column] = values.astype(int)
+
+    # SEMESTER may carry a section/term suffix (2A_premid); the leading digits are the semester
+    semester = courses_df['SEMESTER'].astype(str).str.strip()
+    semester_number = pd.to_numeric(semester.str.extract(r'^(\d+)', expand=False), errors='coerce')
+    for line, raw in zip(lines[semester_number.isna()], semester[semester_number.isna()]):
+        errors.append(f"{filename} line {line}: SEMESTER {raw!r} does not start with a semester number")
+    suffixed = sorted(set(semester[semester_number.notna() & ~semester.str.fullmatch(r'\d+')]))
+    if suffixed:
+        warnings.append(f"{filename}: non-numeric SEMESTER values {', '.join(suffixed)} are scheduled as "
+                        "separate groups (semester number taken from the leading digits)")
+
+    combined = courses_df['COMBINED'].astype(str).str.strip().str.upper().map({'TRUE': True, 'FALSE': False})
+    blank = courses_df['COMBINED'].isna()
+    for line, code in zip(lines[blank], courses_df['COURSE_CODE'][blank]):
+        warnings.append(f"{filename} line {line}: COMBINED is empty for {code}, treating it as FALSE")
+    for line, raw in zip(lines[combined.isna() & ~blank], courses_df['COMBINED'][combined.isna() & ~blank]):
+        errors.append(f"{filename} line {line}: COMBINED {raw!r} is not TRUE or FALSE")
+    combined = combined.fillna(False)
+
+    faculty_ids = []
+    unknown = {}
+    for line, code, raw in zip(lines, courses_df['COURSE_CODE'], courses_df['FACULTY_ID']):
+        parts = [] if pd.isna(raw) else faculty_id_text(raw).split(';')
+        fids = tuple(fid.strip() for fid in parts if fid.strip())
+        if len(fids) != len(parts) or not parts:
+            warnings.append(f"{filename} line {line}: empty FACULTY_ID entry for {code}")
+        for fid in fids:
+            if fid not in faculty_names:
+                unknown.setdefault(fid, []).append(str(code))
+        faculty_ids.append(fids)
+    for fid, codes in sorted(unknown.items()):
+        warnings.append(f"{filename}: faculty id {fid} ({', '.join(codes)}) is not in faculty.csv or electives.csv")
+
+    # SEMESTER_TYPE (odd/even) is optional; it only separates terms in batch mode
+    semester_type = (courses_df['SEMESTER_TYPE'].fillna('').astype(str).str.strip().str.lower()
+                     if 'SEMESTER_TYPE' in courses_df.columns else [''] * len(courses_df))
+
+    valid = course_ids.notna() & capacity.notna() & semester_number.notna()
+    return [Course(int(course_id), str(department), semester_text, int(number), str(code), str(name),
+                   int(l), int(t), int(p), fids, bool(is_combined), int(cap), kind)
+            for ok, course_id, department, semester_text, number, code, name, l, t, p, fids, is_combined, cap, kind
+            in zip(valid, course_ids, courses_df['DEPARTMENT'], semester, semester_number, courses_df['COURSE_CODE'],
+                   courses_df['COURSE_NAME'], hours['L'], hours['T'], hours['P'], faculty_ids, combined, capacity,
+                   semester_type)
+            if ok]
+
+def validate_rooms(rooms_df, errors, warnings):
+    filename = 'rooms.csv'
+    if missing_columns(rooms_df, ROOM_COLUMNS, filename, errors):
+        return
+    if rooms_df.empty:
+        errors.append(f"{filename}: no rooms")
+    lines = rooms_df.index + 2
+    ids = numeric_column(rooms_df, 'id', filename, errors)
+    for line, room_id in zip(lines[ids.duplicated() & ids.notna()], ids[ids.duplicated() & ids.notna()]):
+        errors.append(f"{filename} line {line}: duplicate room id {int(room_id)}")
+    capacity = numeric_column(rooms_df, 'capacity', filename, errors)
+    for line, room_no in zip(lines[capacity <= 0], rooms_df['room no'][capacity <= 0]):
+        errors.append(f"{filename} line {line}: room {room_no} has no capacity")
+    unknown_type = ~rooms_df['room type'].isin(LAB_ROOM_TYPES + LECTURE_ROOM_TYPES)
+    for line, room_no, room_type in zip(lines[unknown_type], rooms_df['room no'][unknown_type],
+                                        rooms_df['room type'][unknown_type]):
+        warnings.append(f"{filename} line {line}: room {room_no} has unknown type {room_type!r} and is never used")
+
+def faculty_name(faculty_names, fid):
+    return faculty_names.get(fid, f"Faculty_{fid}")
+
+def get_faculty_name(faculty_names, faculty_ids):
+    if not faculty_ids:
         return "Unknown"
-    fids = str(faculty_ids).split(';')
-    names = [faculty_map.get(fid, f"Faculty_{fid}") for fid in fids]
-    return ', '.join(names)
-
-def assign_room(course_capacity, is_lab, scheduled_rooms, day, start_slot, duration):
-    # Prioritize larger rooms for high-capacity courses
-    if course_capacity >= 75:
-        available_rooms = rooms_df[rooms_df['capacity'] >= 120]  # C002, C003, C004
-    else:
-        available_rooms = rooms_df[rooms_df['capacity'] >= course_capacity]
-    
-    # Filter by room type (REQ-03, REQ-08)
-    if is_lab:
-        available_rooms = available_rooms[available_rooms['room type'].isin(['COMPUTER_LAB', 'HARDWARE_LAB'])]
-    else:
-        available_rooms = available_rooms[available_rooms['room type'].isin(['LECTURE_ROOM', 'SEATER_120', 'SEATER_240'])]
-    
-    if available_rooms.empty:
-        print(f"No suitable room found for capacity {course_capacity}, lab={is_lab}")
-        return None, None
-    
-    # Check for room conflicts with detailed logging
-    for _, room in available_rooms.sample(frac=1).iterrows():  # Randomize room selection
-        room_id = room['id']
-        room_no = room['room no']
-        if room_id not in scheduled_rooms:
-            scheduled_rooms[room_id] = {d: set() for d in range(len(DAYS))}
-        
-        conflict = False
-        for i in range(duration):
-            if start_slot + i in scheduled_rooms[room_id][day]:
-                print(f"Conflict in room {room_no} (ID: {room_id}) for capacity {course_capacity}, day {day}, slot {start_slot+i}")
-                conflict = True
+    return ', '.join(faculty_name(faculty_names, fid) for fid in faculty_ids)
+
+SLOT_SELECTION = 'random'  # 'random' or 'compact' (prefer slots next to existing sessions)
+
+LARGE_COURSE_CAPACITY = 75    # courses this big go to the large seaters
+LARGE_ROOM_CAPACITY = 120     # C002, C003, C004
+
+def build_room_index(rooms):
+    # Map (is_lab, capacity bucket) -> rooms of that kind with at least that capacity,
+    # sorted by (capacity, id). Buckets are the distinct room capacities, so any request
+    # resolves to the smallest bucket that can hold it.
+    buckets = sorted({room[2] for room in rooms})
+    index = {}
+    for is_lab in (False, True):
+        room_types = LAB_ROOM_TYPES if is_lab else LECTURE_ROOM_TYPES
+        for bucket in buckets:
+            index[(is_lab, bucket)] = tuple(sorted((room for room in rooms if room[3] in room_types and room[2] >= bucket),
+                                                   key=lambda room: (room[2], room[0])))
+    return buckets, index
+
+def room_tables(rooms):
+    # The room lookups of an inputs dict, from (id, room no, capacity, type) records
+    room_buckets, room_index = build_room_index(rooms)
+    labs = room_index.get((True, room_buckets[0]), ()) if room_buckets else ()
+    return {'room_buckets': room_buckets, 'room_index': room_index,
+            'rooms_by_id': {room[0]: room for rooms in room_index.values() for room in rooms},
+            'lab_seats': list(accumulate(sorted((room[2] for room in labs), reverse=True)))}
+
+def suitable_rooms(inputs, course_capacity, is_lab):
+    # Prioritize larger rooms for high-capacity courses, never rooms smaller than the
+    # course. Courses no room can hold are reported once at load time (check_course_rooms).
+    room_buckets = inputs['room_buckets']
+    required = course_capacity
+    if course_capacity >= LARGE_COURSE_CAPACITY:
+        required = max(LARGE_ROOM_CAPACITY, course_capacity)
+    pos = bisect_left(room_buckets, required)
+    return inputs['room_index'][(is_lab, room_buckets[pos])] if pos < len(room_buckets) else ()
+
+def lab_batch_count(inputs, students):
+    # Fewest lab batches that the lab rooms can seat at the same time: the k largest labs
+    # together must hold the whole cohort
+    lab_seats = inputs['lab_seats']
+    return min(bisect_left(lab_seats, students), max(len(lab_seats) - 1, 0)) + 1
+
+def request_rooms(inputs, request):
+    # Candidate rooms of a session; a lab split into batches ('students') may use any lab
+    if 'students' in request:
+        return suitable_rooms(inputs, 0, True)
+    return suitable_rooms(inputs, request['room_capacity'], request['is_lab'])
+
+def match_lab_rooms(rooms, students, batches):
+    # Best-fit batch rooms in one pass: `batches` distinct rooms out of `rooms` (sorted by
+    # capacity) that seat `students` together, each the smallest room that still lets the
+    # largest remaining rooms seat the rest. None when even the largest rooms cannot.
+    pool = list(rooms)
+    chosen = []
+    for left in range(batches, 0, -1):
+        if len(pool) < left:
+            return None
+        split = len(pool) - (left - 1)
+        top = sum(room[2] for room in pool[split:])
+        for idx in range(split):
+            if pool[idx][2] + top >= students:
                 break
-        if not conflict:
-            print(f"Assigned room {room_no} (ID: {room_id}) for capacity {course_capacity}, day {day}, slot {start_slot}")
-            return room_id, room_no
-    
-    print(f"No available room for capacity {course_capacity}, day {day}, slot {start_slot} after checking all options")
-    return None, None
-
-def generate_all_timetables():
-    TIME_SLOTS = generate_time_slots()
-    wb = Workbook()
-    wb.remove(wb.active)
-    
-    professor_schedule = {}
-    classroom_schedule = {}
-    max_attempts = 15000  # Increased attempts to ensure scheduling success
-    
-    # Process each department and semester
-    for department in courses_df['DEPARTMENT'].unique():
-        for semester in courses_df[courses_df['DEPARTMENT'] == department]['SEMESTER'].unique():
-            courses = courses_df[(courses_df['DEPARTMENT'] == department) & 
-                               (courses_df['SEMESTER'] == semester)].copy()
-            
-            if courses.empty:
+        else:
+            return None
+        room = pool.pop(idx)
+        chosen.append(room)
+        students -= room[2]
+    return chosen
+
+def batch_sizes(rooms, students):
+    # Students per batch, in room order: as even as the room capacities allow
+    sizes = [0] * len(rooms)
+    order = sorted(range(len(rooms)), key=lambda idx: rooms[idx][2])
+    for left, idx in zip(range(len(rooms), 0, -1), order):
+        sizes[idx] = students if left == 1 else min(rooms[idx][2], -(-students // left))
+        students -= sizes[idx]
+    return sizes
+
+def usable_rooms(request, rooms):
+    # The free candidate rooms a window offers a session, or None if they cannot seat it:
+    # a lab gets exactly its matched batch rooms, other sessions choose among all of them
+    if 'students' in request:
+        return match_lab_rooms(rooms, request['students'], request['rooms_needed'])
+    return rooms if len(rooms) >= request['rooms_needed'] else None
+
+def check_course_rooms(inputs, warnings):
+    # Courses that no room in rooms.csv can ever hold
+    max_room_capacity = inputs['room_buckets'][-1] if inputs['room_buckets'] else 0
+    for course in inputs['courses']:
+        section_capacity = course.capacity // 2 if course.capacity > max_room_capacity else course.capacity
+        if (course.l or course.t) and not suitable_rooms(inputs, section_capacity, False):
+            warnings.append(f"rooms.csv: no lecture room can seat {section_capacity} for {course.code}")
+        lab_seats = inputs['lab_seats'][-1] if inputs['lab_seats'] else 0
+        if course.p and lab_seats < course.capacity:
+            warnings.append(f"rooms.csv: all labs together seat {lab_seats}, fewer than the {course.capacity} "
+                            f"students of {course.code}")
+    # Basket members run in parallel, so a basket needs one room per member at the same time
+    for basket in {basket['id']: basket for basket in plan_baskets(inputs).values()}.values():
+        members = len(basket['members'])
+        member_capacity = -(-basket['capacity'] // members)
+        rooms = len(suitable_rooms(inputs, member_capacity, False))
+        if (basket['l'] or basket['t']) and rooms < members:
+            warnings.append(f"rooms.csv: basket {basket['id']} runs {members} courses of {member_capacity} students "
+                            f"in parallel but only {rooms} lecture room(s) seat that many")
+
+def check_faculty_limits(inputs, warnings):
+    # Courses with a session longer than a faculty member may teach in one go or in a day
+    durations = inputs['calendar']['durations']
+    for course in inputs['courses']:
+        longest = max([durations['LEC']] * bool(course.l) + [durations['TUT']] * bool(course.t)
+                      + [durations['LAB']] * bool(course.p), default=0)
+        for fid in course.faculty_ids:
+            limits = inputs['faculty_limits'].get(fid)
+            if not limits or not longest:
                 continue
-            
+            cap = min(limit for limit in (limits['max_slots'], limits['max_run'], longest) if limit is not None)
+            if cap < longest:
+                warnings.append(f"faculty.csv: {faculty_name(inputs['faculty_names'], fid)} may teach at most {cap} "
+                                f"slot(s) in a row, but {course.code} has {longest}-slot sessions")
+
+def check_basket_faculty(inputs, warnings):
+    # Basket rows whose FACULTY_ID is not one of the members' faculty in electives.csv;
+    # they are booked for the basket's sessions as well
+    courses = {(course.department, course.semester, course.course_id): course for course in inputs['courses']}
+    for key, basket in plan_baskets(inputs).items():
+        course = courses[key]
+        member_ids = {fid for _, fids in basket['members'] for fid in fids}
+        extra = [fid for fid in course.faculty_ids if fid not in member_ids]
+        if extra:
+            warnings.append(f"courses.csv: FACULTY_ID {', '.join(extra)} of {course.code} ({course.department} "
+                            f"{course.semester}) is not among the electives.csv faculty of basket {basket['id']}; "
+                            "booking them too")
+
+INPUT_PATHS = {'courses': 'courses.csv', 'electives': 'electives.csv', 'rooms': 'rooms.csv',
+               'faculty': 'faculty.csv'}
+
+class InputError(ValueError):
+    # Raised by load_inputs() with every problem found; .errors lists them
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+def load_inputs(paths=None):
+    # Read and validate all inputs once (REQ-02). `paths` overrides INPUT_PATHS per file;
+    # 'calendar' names a calendar file, by default CALENDAR_PATH when it exists (None
+    # forces the built-in calendar). Returns {'courses', 'faculty_names', 'faculty_limits', 'baskets',
+    # 'room_buckets', 'room_index', 'rooms_by_id', 'lab_seats' (seats of the 1, 2, ...
+    # largest labs), 'calendar', 'snapshot', 'warnings'}; the result can be scheduled any
+    # number of times.
+    import pandas as pd
+    paths = dict(INPUT_PATHS, **(paths or {}))
+    calendar_path = paths.pop('calendar', CALENDAR_PATH if os.path.exists(CALENDAR_PATH) else None)
+    errors = []
+    try:
+        frames = {kind: pd.read_csv(path) for kind, path in paths.items()}
+        calendar_config = load_calendar(calendar_path, errors) if calendar_path else None
+    except FileNotFoundError as e:
+        raise InputError([f"File {e.filename} not found"])
+
+    warnings = []
+    calendar = build_calendar(calendar_config) if not errors else None
+    faculty_names = load_faculty_names(frames['faculty'], frames['electives'], errors)
+    faculty_limits = load_faculty_limits(frames['faculty'], calendar, errors) if calendar else {}
+    baskets = load_baskets(frames['electives'], errors)
+    courses = parse_courses(frames['courses'], faculty_names, errors, warnings)
+    validate_rooms(frames['rooms'], errors, warnings)
+    if errors:
+        raise InputError(errors)
+
+    rooms_df = frames['rooms']
+    rooms = [(int(room_id), str(room_no), int(capacity), str(room_type))
+             for room_id, room_no, capacity, room_type in
+             zip(rooms_df['id'], rooms_df['room no'], rooms_df['capacity'], rooms_df['room type'])]
+    inputs = {'courses': courses, 'faculty_names': faculty_names, 'faculty_limits': faculty_limits,
+              'baskets': baskets, 'calendar': calendar,
+              'snapshot': input_snapshot(frames['courses'], rooms_df), 'warnings': warnings}
+    inputs.update(room_tables(rooms))
+    check_course_rooms(inputs, warnings)
+    check_faculty_limits(inputs, warnings)
+    check_basket_faculty(inputs, warnings)
+    return inputs
+
+def free_rooms(room_candidates, occupancy, day, start_slot, duration):
+    # Candidate rooms free for the whole window, in candidate order. With a room slot
+    # index this is one AND per slot of the window; without one (a sandbox or a result
+    # rebuilt from a state file) every candidate's day mask is tested.
+    index = occupancy.get('room_slots')
+    if index is None:
+        mask = window_mask(start_slot, duration)
+        room_masks = occupancy['room']
+        return [room for room in room_candidates
+                if room[0] not in room_masks or not room_masks[room[0]][day] & mask]
+    candidates = index['candidates'].get(id(room_candidates))
+    if candidates is None:
+        candidates = index['candidates'][id(room_candidates)] = (
+            room_candidates, sum(1 << index['position'][room[0]] for room in room_candidates))
+    busy = 0
+    for slot_busy in index['busy'][day][start_slot:start_slot + duration]:
+        busy |= slot_busy
+    free = candidates[1] & ~busy
+    if free == candidates[1]:
+        return list(room_candidates)
+    # Decoded a byte at a time: each (byte number, value) maps to its rooms once
+    rooms = []
+    chunks = index['chunks']
+    for number, value in enumerate(free.to_bytes(len(chunks), 'little')):
+        if value:
+            chunk = chunks[number].get(value)
+            if chunk is None:
+                chunk = chunks[number][value] = [index['rooms'][8 * number + bit] for bit in range(8) if value >> bit & 1]
+            rooms += chunk
+    return rooms
+
+# Occupancy index: one integer bitmask per (resource, day), bit i set = slot i taken.
+# occupancy = {'faculty': {fid: [mask per day]}, 'room': {room_id: [...]},
+#              'section': {(department, semester, section): [...]}}
+# With inputs it also holds 'room_slots', the same room masks turned around: per (day,
+# slot) one bitmask of the busy rooms, bit p for the room at position p of the room index
+# order (capacity, then id), so a window's free rooms come out already best-fit sorted.
+# occupy() and release() keep it in step; OCCUPANCY_KINDS are the masks proper.
+OCCUPANCY_KINDS = ('faculty', 'room', 'section')
+
+def room_slot_index(inputs):
+    rooms = sorted(inputs['rooms_by_id'].values(), key=lambda room: (room[2], room[0]))
+    calendar = inputs['calendar']
+    return {'position': {room[0]: position for position, room in enumerate(rooms)}, 'rooms': rooms,
+            'busy': [[0] * len(calendar['slots']) for _ in calendar['days']],
+            'candidates': {},  # id(candidate tuple) -> (tuple, bitmask of its positions)
+            'chunks': [{} for _ in range(-(-len(rooms) // 8))]}  # per byte of a mask: value -> rooms
+
+def mark_room_slots(occupancy, room_id, day, mask, busy):
+    index = occupancy.get('room_slots')
+    if index is None or room_id not in index['position']:
+        return
+    bit = 1 << index['position'][room_id]
+    slots = index['busy'][day]
+    while mask:
+        slot_bit = mask & -mask
+        mask ^= slot_bit
+        slot = slot_bit.bit_length() - 1
+        slots[slot] = slots[slot] | bit if busy else slots[slot] & ~bit
+
+def new_occupancy(inputs=None):
+    # With inputs, faculty unavailability and any 'reserved' occupancy (sessions fixed by an
+    # earlier run, see schedule_terms) are preloaded as busy slots, so no check needs them
+    occupancy = {'faculty': {}, 'room': {}, 'section': {}}
+    if inputs:
+        occupancy['faculty'] = {fid: list(limits['unavailable']) for fid, limits in inputs['faculty_limits'].items()}
+        occupancy['room_slots'] = room_slot_index(inputs)
+        for kind in OCCUPANCY_KINDS:
+            for key, day_masks in inputs.get('reserved', {}).get(kind, {}).items():
+                for day, mask in enumerate(day_masks):
+                    occupy(occupancy, kind, key, day, mask, len(day_masks))
+    return occupancy
+
+def window_mask(start_slot, duration):
+    return ((1 << duration) - 1) << start_slot
+
+def busy_mask(occupancy, kind, keys, day):
+    mask = 0
+    for key in keys:
+        masks = occupancy[kind].get(key)
+        if masks is not None:
+            mask |= masks[day]
+    return mask
+
+def occupy(occupancy, kind, key, day, mask, num_days):
+    masks = occupancy[kind].setdefault(key, [0] * num_days)
+    masks[day] |= mask
+    if kind == 'room':
+        mark_room_slots(occupancy, key, day, mask, True)
+
+def free_window_starts(busy, duration, num_slots):
+    # Bit s of the result is set iff slots s..s+duration-1 are all free
+    free = ~busy & ((1 << num_slots) - 1)
+    starts = free
+    for i in range(1, duration):
+        starts &= free >> i
+    return starts
+
+def release(occupancy, kind, key, day, mask):
+    occupancy[kind][key][day] &= ~mask
+    if kind == 'room':
+        mark_room_slots(occupancy, key, day, mask, False)
+
+def run_length(mask, slot):
+    # Length of the run of set bits through `slot`
+    low = high = slot
+    while low > 0 and mask >> (low - 1) & 1:
+        low -= 1
+    while mask >> (high + 1) & 1:
+        high += 1
+    return high - low + 1
+
+def faculty_load_starts(inputs, occupancy, faculty_ids, day, duration, starts):
+    # Clear the starts that would take a faculty member past their teaching slots per day
+    # or their consecutive teaching slots (unavailable slots do not count as teaching)
+    for fid in faculty_ids:
+        limits = inputs['faculty_limits'].get(fid)
+        if not limits or not starts:
+            continue
+        teaching = busy_mask(occupancy, 'faculty', [fid], day) & ~limits['unavailable'][day]
+        if limits['max_slots'] is not None and bin(teaching).count('1') + duration > limits['max_slots']:
+            return 0
+        if limits['max_run'] is not None:
+            remaining = starts
+            while remaining:
+                start_bit = remaining & -remaining
+                remaining ^= start_bit
+                start_slot = start_bit.bit_length() - 1
+                if run_length(teaching | window_mask(start_slot, duration), start_slot) > limits['max_run']:
+                    starts ^= start_bit
+    return starts
+
+MAX_COURSE_DAYS = 2     # lectures (or labs) of a course go on distinct days, at most this many
+MAX_TUTORIAL_DAYS = 3   # tutorials only while the course has them on fewer days than this
+SESSION_NAMES = {'LEC': 'lecture', 'TUT': 'tutorial', 'LAB': 'lab'}
+
+def session_counts(l, t, p):
+    # Sessions per type for L/T/P hours: a lecture or tutorial per hour, one lab for any P
+    return {'LEC': l, 'TUT': t, 'LAB': min(p, 1)}
+
+# A session request is one lecture, tutorial or lab to place for a set of sections.
+# 'days' is the day rule: 'any', 'spread' (new day, up to MAX_COURSE_DAYS) or
+# 'tutorial' (any day while the course is on fewer than MAX_TUTORIAL_DAYS days). Days
+# count per course and session type: a section's `course_days` is keyed by day_key().
+def session_request(course_id, code, name, faculty_ids, faculty, session_type, duration,
+                    room_capacity, is_lab, rooms_needed, sections, days):
+    return {'course_id': course_id, 'code': code, 'name': name, 'faculty_ids': list(faculty_ids),
+            'faculty': faculty, 'type': session_type, 'duration': duration, 'room_capacity': room_capacity,
+            'is_lab': is_lab, 'rooms_needed': rooms_needed, 'sections': sections, 'days': days}
+
+def build_session_requests(department, semester, courses, sections, inputs, baskets):
+    # Requests come out in the order the greedy engine places them: this group's copies
+    # of the joint basket sessions first, then every section's core courses (lab,
+    # lectures, tutorials). `baskets` maps (department, semester, course_id) of each
+    # COMBINED course to its basket (plan_baskets).
+    requests = []
+    faculty_names = inputs['faculty_names']
+    durations = inputs['calendar']['durations']
+
+    def course_fields(course):
+        return (course.course_id, course.code, course.name, course.faculty_ids,
+                get_faculty_name(faculty_names, course.faculty_ids), course.capacity, course.l, course.t, course.p)
+
+    # Every member of a basket gets its own room and the students split evenly between them
+    for course in courses:
+        if not course.combined:
+            continue
+        basket = baskets[(department, semester, course.course_id)]
+        members = basket['members']
+        faculty_ids = basket['faculty_ids']
+        member_capacity = -(-basket['capacity'] // len(members))
+        # Labs in equal batches per member, as many as the lab rooms need
+        lab_batches = lab_batch_count(inputs, member_capacity)
+        counts = session_counts(basket['l'], basket['t'], basket['p'])
+        for session_type, is_lab, batches in (('LEC', False, 1), ('TUT', False, 1), ('LAB', True, lab_batches)):
+            for number in range(1, counts[session_type] + 1):
+                request = session_request(course.course_id, course.code, course.name, faculty_ids,
+                                          get_faculty_name(faculty_names, faculty_ids), session_type,
+                                          durations[session_type], -(-member_capacity // batches), is_lab,
+                                          batches * len(members), sections[course.course_id], 'any')
+                request.update(basket=basket['id'], basket_session=number,
+                               members=[[name, list(fids)] for name, fids in members])
+                requests.append(request)
+
+    # Core courses for each section
+    core_courses = [course for course in courses if not course.combined]
+    for section in sorted(set(sum(sections.values(), []))):
+        for course in core_courses:
+            course_id, code, name, faculty_ids, faculty, capacity, l, t, p = course_fields(course)
+            if section not in sections[course_id]:
+                continue
+            counts = session_counts(l, t, p)
+            # Labs with strength division: as few batches as the lab rooms allow, each
+            # batch in its own lab (room_capacity is the average batch)
+            for _ in range(counts['LAB']):
+                batches = lab_batch_count(inputs, capacity)
+                request = session_request(course_id, code, name, faculty_ids, faculty, 'LAB', durations['LAB'],
+                                          -(-capacity // batches), True, batches, [section], 'spread')
+                request['students'] = capacity
+                requests.append(request)
+            for _ in range(counts['LEC']):
+                requests.append(session_request(course_id, code, name, faculty_ids, faculty, 'LEC', durations['LEC'],
+                                                capacity, False, 1, [section], 'spread'))
+            for _ in range(counts['TUT']):
+                requests.append(session_request(course_id, code, name, faculty_ids, faculty, 'TUT', durations['TUT'],
+                                                capacity // len(sections[course_id]), False, 1, [section], 'tutorial'))
+    return requests
+
+# Scheduling state shared by the engines for one department/semester:
+# {'inputs', 'calendar', 'occupancy', 'group', 'section_timetables', 'stats'}
+
+# Per-group counters kept by find_feasible_slots: every (day, start_slot) window tried and
+# the first constraint that rejected it, in CONFLICT_CAUSES order. With profiling on they
+# also hold the group's wall time, seconds per check and, per "code type", the number of
+# slot searches, windows tried and seconds spent.
+CONFLICT_CAUSES = ('break', 'section', 'faculty', 'room')
+PROFILED_CHECKS = ('section', 'faculty', 'room')
+
+def new_stats(profile=False):
+    stats = {'attempts': 0, 'conflicts': dict.fromkeys(CONFLICT_CAUSES, 0)}
+    if profile:
+        stats.update(seconds=0.0, checks=dict.fromkeys(PROFILED_CHECKS, 0.0), courses={})
+    return stats
+
+def day_key(request):
+    return (request['course_id'], request['type'])
+
+def allowed_days(request, state):
+    all_days = list(range(len(state['calendar']['days'])))
+    if request['days'] == 'any':
+        return all_days
+    used = [state['section_timetables'][section]['course_days'].get(day_key(request), set())
+            for section in request['sections']]
+    if request['days'] == 'tutorial':
+        return all_days if all(len(days) < MAX_TUTORIAL_DAYS for days in used) else []
+    if any(len(days) >= MAX_COURSE_DAYS for days in used):
+        return []
+    return [d for d in all_days if not any(d in days for days in used)]
+
+def request_section_keys(request, state):
+    # A joint basket session (schedule_baskets) carries the sections of all its groups
+    if 'section_keys' in request:
+        return request['section_keys']
+    return [state['group'] + (section,) for section in request['sections']]
+
+def find_feasible_slots(request, state, days):
+    # Enumerate every (day, start_slot) where the window avoids breaks, every section and
+    # every faculty member is free and within their load limits, and at least `rooms_needed`
+    # suitable rooms are free (for a lab: free labs that seat all its batches, already matched).
+    # Returns [(day, start_slot, free_rooms), ...]; empty means unschedulable.
+    occupancy = state['occupancy']
+    duration = request['duration']
+    num_slots = len(state['calendar']['slots'])
+    section_keys = request_section_keys(request, state)
+    room_candidates = request_rooms(state['inputs'], request)
+    windows = max(0, num_slots - duration + 1)
+    open_starts = state['calendar']['starts'][duration]  # windows clear of breaks
+    open_windows = bin(open_starts).count('1')
+    limited = any(fid in state['inputs']['faculty_limits'] for fid in request['faculty_ids'])
+    stats = state['stats']
+    conflicts = stats['conflicts']
+    stats['attempts'] += windows * len(days)
+    conflicts['break'] += (windows - open_windows) * len(days)
+    profile = 'checks' in stats
+    if profile:
+        checks = stats['checks']
+        started = perf_counter()
+    candidates = []
+    for day in days:
+        if profile:
+            check_start = perf_counter()
+        section_starts = open_starts & free_window_starts(busy_mask(occupancy, 'section', section_keys, day),
+                                                          duration, num_slots)
+        if profile:
+            section_done = perf_counter()
+        starts = section_starts & free_window_starts(busy_mask(occupancy, 'faculty', request['faculty_ids'], day),
+                                                     duration, num_slots)
+        if limited:
+            starts = faculty_load_starts(state['inputs'], occupancy, request['faculty_ids'], day, duration, starts)
+        if profile:
+            faculty_done = perf_counter()
+        section_free = bin(section_starts).count('1')
+        conflicts['section'] += open_windows - section_free
+        conflicts['faculty'] += section_free - bin(starts).count('1')
+        while starts:
+            start_bit = starts & -starts
+            starts ^= start_bit
+            start_slot = start_bit.bit_length() - 1
+            rooms = usable_rooms(request, free_rooms(room_candidates, occupancy, day, start_slot, duration))
+            if rooms is not None:
+                candidates.append((day, start_slot, rooms))
+            else:
+                conflicts['room'] += 1
+        if profile:
+            checks['section'] += section_done - check_start
+            checks['faculty'] += faculty_done - section_done
+            checks['room'] += perf_counter() - faculty_done
+    if profile:
+        course = stats['courses'].setdefault(f"{request['code']} {request['type']}",
+                                             {'searches': 0, 'windows': 0, 'seconds': 0.0})
+        course['searches'] += 1
+        course['windows'] += windows * len(days)
+        course['seconds'] += perf_counter() - started
+    return candidates
+
+def diagnose(request, state, days):
+    # Name the first constraint that leaves no window for an unplaced request
+    if not days:
+        limit = MAX_TUTORIAL_DAYS if request['days'] == 'tutorial' else MAX_COURSE_DAYS
+        return f"course already uses its {limit} days"
+    occupancy = state['occupancy']
+    duration = request['duration']
+    break_mask = state['calendar']['break_mask']
+    num_slots = len(state['calendar']['slots'])
+    section_keys = request_section_keys(request, state)
+    if not any(free_window_starts(break_mask | busy_mask(occupancy, 'section', section_keys, day),
+                                  duration, num_slots) for day in days):
+        return "no free window in the section timetable"
+    if not any(free_window_starts(break_mask | busy_mask(occupancy, 'section', section_keys, day)
+                                  | busy_mask(occupancy, 'faculty', request['faculty_ids'], day), duration, num_slots)
+               for day in days):
+        return "faculty busy in every free section window"
+    if not any(faculty_load_starts(state['inputs'], occupancy, request['faculty_ids'], day, duration,
+                                   free_window_starts(break_mask | busy_mask(occupancy, 'section', section_keys, day)
+                                                      | busy_mask(occupancy, 'faculty', request['faculty_ids'], day),
+                                                      duration, num_slots))
+               for day in days):
+        return "faculty at their daily or consecutive teaching limit in every free window"
+    if 'students' in request:
+        return (f"free labs cannot seat {request['students']} students in {request['rooms_needed']} batch(es) "
+                "in any remaining window")
+    return f"fewer than {request['rooms_needed']} suitable room(s) free in every remaining window"
+
+def choose_slot(candidates, request, state):
+    if SLOT_SELECTION == 'compact':
+        # Score by the number of section sessions directly adjacent to the window
+        section_masks = state['occupancy']['section']
+        section_keys = request_section_keys(request, state)
+        duration = request['duration']
+
+        def score(candidate):
+            day, start_slot, _ = candidate
+            edges = (1 << (start_slot + duration)) | ((1 << start_slot) >> 1)
+            return sum(bin(section_masks[key][day] & edges).count('1')
+                       for key in section_keys if key in section_masks)
+        best = max(score(c) for c in candidates)
+        candidates = [c for c in candidates if score(c) == best]
+    return random.choice(candidates)
+
+def commit_session(request, state, day, start_slot, rooms):
+    # A lab lists each batch with its room and size, and a basket session all its member
+    # rooms in every section; otherwise with one room per section each section gets its own.
+    occupancy = state['occupancy']
+    duration = request['duration']
+    mask = window_mask(start_slot, duration)
+    num_days = len(state['calendar']['days'])
+    batches = []
+    if 'students' in request:
+        batches = [[room[1], size] for room, size in zip(rooms, batch_sizes(rooms, request['students']))]
+    for idx, section in enumerate(request['sections']):
+        timetable = state['section_timetables'][section]['timetable']
+        if batches:
+            classroom = ''
+        elif not request.get('basket') and len(rooms) == len(request['sections']):
+            classroom = rooms[idx][1]
+        else:
+            classroom = '/'.join(room[1] for room in rooms)
+        for i in range(duration):
+            timetable[day][start_slot+i]['type'] = request['type']
+            timetable[day][start_slot+i]['code'] = request['code'] if i == 0 else ''
+            timetable[day][start_slot+i]['name'] = request['name'] if i == 0 else ''
+            timetable[day][start_slot+i]['faculty'] = request['faculty'] if i == 0 else ''
+            timetable[day][start_slot+i]['classroom'] = classroom if i == 0 else ''
+            timetable[day][start_slot+i]['batches'] = batches if i == 0 else []
+        state['section_timetables'][section]['course_days'].setdefault(day_key(request), set()).add(day)
+        occupy(occupancy, 'section', state['group'] + (section,), day, mask, num_days)
+    for room in rooms:
+        occupy(occupancy, 'room', room[0], day, mask, num_days)
+    for fid in request['faculty_ids']:
+        occupy(occupancy, 'faculty', fid, day, mask, num_days)
+
+def undo_session(request, state, day, start_slot, rooms, saved_course_days):
+    occupancy = state['occupancy']
+    duration = request['duration']
+    mask = window_mask(start_slot, duration)
+    for section, days in zip(request['sections'], saved_course_days):
+        timetable = state['section_timetables'][section]['timetable']
+        for i in range(duration):
+            timetable[day][start_slot+i].update({'type': None, 'code': '', 'name': '', 'faculty': '', 'classroom': '',
+                                                 'batches': []})
+        state['section_timetables'][section]['course_days'][day_key(request)] = days
+        release(occupancy, 'section', state['group'] + (section,), day, mask)
+    for room in rooms:
+        release(occupancy, 'room', room[0], day, mask)
+    for fid in request['faculty_ids']:
+        release(occupancy, 'faculty', fid, day, mask)
+
+def schedule_greedy(requests, state, time_limit=None):
+    # Commit each request to a random (or best-scoring) feasible slot in order.
+    # Returns [(request, (day, start_slot, rooms) or None, failure reason), ...]
+    results = []
+    for request in requests:
+        days = allowed_days(request, state)
+        candidates = find_feasible_slots(request, state, days)
+        if not candidates:
+            results.append((request, None, diagnose(request, state, days)))
+            continue
+        day, start_slot, rooms = choose_slot(candidates, request, state)
+        rooms = random.sample(rooms, request['rooms_needed'])
+        commit_session(request, state, day, start_slot, rooms)
+        results.append((request, (day, start_slot, rooms), None))
+    return results
+
+BACKTRACK_TIME_LIMIT = 5.0  # seconds per department/semester
+
+def schedule_backtracking(requests, state, time_limit=BACKTRACK_TIME_LIMIT):
+    # Branch and bound over the whole department/semester: pick the unassigned request
+    # with the fewest feasible slots (MRV), try each slot or leave it unplaced, recompute
+    # the remaining domains after every commit (forward checking) and prune branches that
+    # cannot beat the best assignment found. Rooms are assigned best-fit (smallest
+    # suitable free rooms). Proves the maximum number of placeable sessions unless the
+    # time limit is reached, in which case the best assignment found is kept.
+    n = len(requests)
+    deadline = monotonic() + time_limit
+    # Identical requests (same course, type and sections) are interchangeable, so they are
+    # decided in order and placed at increasing (day, start_slot) to avoid symmetric branches.
+    twin_prev = [None] * n
+    last_seen = {}
+    for idx, request in enumerate(requests):
+        key = (request['course_id'], request['type'], tuple(request['sections']))
+        twin_prev[idx] = last_seen.get(key)
+        last_seen[key] = idx
+
+    assignment = [None] * n  # None = undecided, False = left unplaced, else (day, start_slot, rooms)
+    # Leaving everything unplaced is the fallback when time runs out before the first leaf
+    best = {'placed': 0, 'assignment': [False] * n}
+    stats = {'nodes': 0, 'timed_out': False}
+
+    def domain(idx):
+        request = requests[idx]
+        prev = twin_prev[idx]
+        if prev is not None and assignment[prev] is False:
+            return []
+        candidates = find_feasible_slots(request, state, allowed_days(request, state))
+        if prev is not None:
+            prev_day, prev_start, _ = assignment[prev]
+            candidates = [c for c in candidates if (c[0], c[1]) > (prev_day, prev_start)]
+        return candidates
+
+    def placeable_bound(undecided, domains):
+        # Requests with an empty domain can never be placed from here on, and a course can
+        # only add 'spread' sessions on the days left under MAX_COURSE_DAYS
+        spread_left = {}
+        bound = 0
+        for i in undecided:
+            if i in domains and not domains[i]:
+                continue
+            request = requests[i]
+            if request['days'] == 'spread':
+                key = (day_key(request), tuple(request['sections']))
+                if key not in spread_left:
+                    used = max(len(state['section_timetables'][section]['course_days'].get(day_key(request), ()))
+                               for section in request['sections'])
+                    spread_left[key] = max(0, MAX_COURSE_DAYS - used)
+                if not spread_left[key]:
+                    continue
+                spread_left[key] -= 1
+            bound += 1
+        return bound
+
+    def search(placed):
+        stats['nodes'] += 1
+        if monotonic() > deadline:
+            stats['timed_out'] = True
+            return
+        undecided = [i for i in range(n) if assignment[i] is None]
+        eligible = [i for i in undecided if twin_prev[i] is None or assignment[twin_prev[i]] is not None]
+        if not eligible:
+            if placed > best['placed']:
+                best['placed'] = placed
+                best['assignment'] = list(assignment)
+            return
+        domains = {i: domain(i) for i in eligible}
+        if placed + placeable_bound(undecided, domains) <= best['placed']:
+            return
+        forced = [i for i in eligible if not domains[i]]
+        if forced:
+            for i in forced:
+                assignment[i] = False
+            search(placed)
+            for i in forced:
+                assignment[i] = None
+            return
+
+        idx = min(eligible, key=lambda i: len(domains[i]))
+        request = requests[idx]
+        for day, start_slot, rooms in domains[idx]:
+            rooms = rooms[:request['rooms_needed']]
+            saved = [set(state['section_timetables'][section]['course_days'].get(day_key(request), set()))
+                     for section in request['sections']]
+            commit_session(request, state, day, start_slot, rooms)
+            assignment[idx] = (day, start_slot, rooms)
+            search(placed + 1)
+            assignment[idx] = None
+            undo_session(request, state, day, start_slot, rooms, saved)
+            if stats['timed_out'] or best['placed'] == n:
+                return
+        assignment[idx] = False
+        search(placed)
+        assignment[idx] = None
+
+    search(0)
+    status = 'time limit reached' if stats['timed_out'] else 'optimal'
+    logger.info("Backtracking %s %s: %d/%d sessions placed (%s, %d nodes)",
+                state['group'][0], state['group'][1], best['placed'], n, status, stats['nodes'])
+
+    # Re-apply the best assignment, then explain each unplaced request against it
+    results = []
+    for request, placement in zip(requests, best['assignment']):
+        if placement:
+            commit_session(request, state, *placement)
+    for request, placement in zip(requests, best['assignment']):
+        if placement:
+            results.append((request, placement, None))
+        else:
+            results.append((request, None, diagnose(request, state, allowed_days(request, state))))
+    return results
+
+SCHEDULERS = {'greedy': schedule_greedy, 'backtrack': schedule_backtracking}
+
+def basket_session_key(request):
+    return (request['basket'], request['type'], request['basket_session'])
+
+def schedule_baskets(copies, states):
+    # Place each joint basket session once for all its copies, before the engines run.
+    # copies = [(state index, request), ...] over states sharing one occupancy index. A
+    # single search covers the sections of every group taking the basket, the faculty of
+    # every member and one suitable room per member; sessions of one basket and type go
+    # on different days while days remain. Returns (placement, reason) per copy.
+    joint = {}
+    for n, (_, request) in enumerate(copies):
+        joint.setdefault(basket_session_key(request), []).append(n)
+    outcomes = [None] * len(copies)
+    used_days = {}
+    for (basket, session_type, _), members in joint.items():
+        g, lead = copies[members[0]]
+        state = states[g]
+        request = dict(lead, section_keys=[key for n in members
+                                           for key in request_section_keys(copies[n][1], states[copies[n][0]])])
+        days = used_days.setdefault((basket, session_type), set())
+        all_days = range(len(state['calendar']['days']))
+        allowed = [day for day in all_days if day not in days] or list(all_days)
+        candidates = find_feasible_slots(request, state, allowed)
+        if not candidates:
+            reason = diagnose(request, state, allowed)
+            for n in members:
+                outcomes[n] = (None, reason)
+            continue
+        day, start_slot, rooms = choose_slot(candidates, request, state)
+        placement = (day, start_slot, random.sample(rooms, request['rooms_needed']))
+        for n in members:
+            commit_session(copies[n][1], states[copies[n][0]], *placement)
+            outcomes[n] = (placement, None)
+        days.add(day)
+    return outcomes
+
+def report_results(group, calendar):
+    # One debug record per session; skipped entirely unless debug logging is on
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    for request, placement, reason in group['results']:
+        kind = SESSION_NAMES[request['type']]
+        label = ('section ' if len(request['sections']) == 1 else 'sections ') + ', '.join(request['sections'])
+        event = {'event': 'placed' if placement else 'unplaced', 'department': group['department'],
+                 'semester': group['semester'], 'code': request['code'], 'type': request['type'],
+                 'sections': request['sections']}
+        if placement:
+            day, start_slot, rooms = placement
+            event.update(day=calendar['days'][day], start_slot=start_slot, rooms=[room[1] for room in rooms])
+            logger.debug("Scheduling %s %s (%s) on %s at %s in %s", kind, request['code'], label,
+                         calendar['days'][day], minutes_label(calendar['slots'][start_slot][0]),
+                         '/'.join(room[1] for room in rooms), extra={'event': event})
+        else:
+            event['reason'] = reason
+            logger.debug("Failed to schedule %s %s (%s): %s", kind, request['code'], label, reason,
+                         extra={'event': event})
+
+def run_summary(result):
+    # Totals over all groups: windows tried, rejections by cause, and unplaced sessions per course
+    summary = new_stats()
+    summary.update(placed=0, unplaced=0, failures={})
+    for group in result['groups']:
+        stats = group.get('stats', new_stats())
+        summary['attempts'] += stats['attempts']
+        for cause, count in stats['conflicts'].items():
+            summary['conflicts'][cause] += count
+        for request, placement, _ in group['results']:
+            if placement:
+                summary['placed'] += 1
+            else:
+                summary['unplaced'] += 1
+                summary['failures'][request['code']] = summary['failures'].get(request['code'], 0) + 1
+    return summary
+
+def log_summary(summary):
+    conflicts = ', '.join(f"{cause} {summary['conflicts'][cause]}" for cause in CONFLICT_CAUSES)
+    logger.info("Run summary: %d sessions placed, %d unplaced; %d windows tried, rejected by %s",
+                summary['placed'], summary['unplaced'], summary['attempts'], conflicts,
+                extra={'event': dict(summary, event='summary')})
+    if summary['failures']:
+        logger.info("Unplaced sessions per course: %s",
+                    ', '.join(f"{code} {count}" for code, count in sorted(summary['failures'].items())))
+
+PROFILE_TOP_COURSES = 10  # courses listed at info level; the rest go to debug / the JSON log
+
+def log_profile(result, phases):
+    # Timing report of a profiled run: phases, groups, constraint checks, and the courses
+    # whose slot searches took the longest
+    logger.info("Phase times: %s", ', '.join(f"{phase} {seconds:.3f}s" for phase, seconds in phases.items()),
+                extra={'event': dict(phases, event='phases')})
+    checks = dict.fromkeys(PROFILED_CHECKS, 0.0)
+    courses = {}
+    for group in result['groups']:
+        stats = group.get('stats', {})
+        if 'checks' not in stats:
+            continue
+        logger.debug("Group %s %s: %.3fs, %d windows tried", group['department'], group['semester'],
+                     stats['seconds'], stats['attempts'],
+                     extra={'event': {'event': 'group_profile', 'department': group['department'],
+                                      'semester': group['semester'], 'seconds': stats['seconds'],
+                                      'attempts': stats['attempts']}})
+        for check, seconds in stats['checks'].items():
+            checks[check] += seconds
+        for key, entry in stats['courses'].items():
+            courses[f"{group['department']} {group['semester']} {key}"] = entry
+    logger.info("Check times: %s", ', '.join(f"{check} {seconds:.3f}s" for check, seconds in checks.items()),
+                extra={'event': dict(checks, event='checks')})
+    ranked = sorted(courses.items(), key=lambda item: -item[1]['seconds'])
+    for rank, (course, entry) in enumerate(ranked):
+        logger.log(logging.INFO if rank < PROFILE_TOP_COURSES else logging.DEBUG,
+                   "%s: %d slot searches, %d windows, %.4fs", course, entry['searches'], entry['windows'],
+                   entry['seconds'], extra={'event': dict(entry, event='course_profile', course=course)})
+
+def empty_timetable(calendar):
+    # 'batches' lists [room no, students] per lab batch; 'classroom' holds any other rooms
+    return {day: {slot: {'type': None, 'code': '', 'name': '', 'faculty': '', 'classroom': '', 'batches': []}
+                  for slot in range(len(calendar['slots']))} for day in range(len(calendar['days']))}
+
+def plan_baskets(inputs):
+    # COMBINED courses are taught jointly by basket: rows with the same basket code, semester
+    # number and term (the SEMESTER suffix after '_', e.g. premid) share one set of sessions,
+    # whatever their department or section. The basket code is the B1, B2, ... prefix of
+    # COURSE_CODE when electives.csv lists that basket for the semester, which also names
+    # the members; any other combined course is its own single member. Hours are the most
+    # any row asks for, students the sum over all rows. The basket's faculty are the
+    # members' plus any other FACULTY_ID of its course rows (check_basket_faculty).
+    # Returns {(department, semester, course_id): {'id', 'members', 'faculty_ids', 'capacity', 'l', 't', 'p'}}.
+    baskets = {}
+    by_course = {}
+    for course in inputs['courses']:
+        if not course.combined:
+            continue
+        match = re.match(r'B\d+', course.code)
+        members = inputs['baskets'].get((match.group(), course.semester_number)) if match else None
+        code = match.group() if members else course.code
+        term = course.semester.partition('_')[2]
+        basket_id = f"{code} {course.semester_number}" + (f"_{term}" if term else '')
+        members = members or [(course.name, course.faculty_ids)]
+        basket = baskets.setdefault(basket_id, {'id': basket_id, 'members': members,
+                                                'faculty_ids': list(dict.fromkeys(fid for _, fids in members
+                                                                                  for fid in fids)),
+                                                'capacity': 0, 'l': 0, 't': 0, 'p': 0})
+        basket['faculty_ids'] += [fid for fid in course.faculty_ids if fid not in basket['faculty_ids']]
+        basket['capacity'] += course.capacity
+        for hours in ('l', 't', 'p'):
+            basket[hours] = max(basket[hours], getattr(course, hours))
+        by_course[(course.department, course.semester, course.course_id)] = basket
+    return by_course
+
+def plan_groups(inputs):
+    # Every department/semester with its empty section timetables and session requests
+    groups = []
+    baskets = plan_baskets(inputs)
+
+    # Process each department and semester, in order of first appearance
+    semesters_by_department = {}
+    for course in inputs['courses']:
+        semesters_by_department.setdefault(course.department, {}).setdefault(course.semester, []).append(course)
+    for department, semesters in semesters_by_department.items():
+        for semester, courses in semesters.items():
             # Split into sections if capacity exceeds max room (REQ-03)
-            max_room_capacity = rooms_df['capacity'].max()
+            max_room_capacity = inputs['room_buckets'][-1]
             sections = {}
-            for _, course in courses.iterrows():
-                course_id = course['COURSE_ID']
-                capacity = course['CAPACITY']
-                if capacity > max_room_capacity:
-                    sections[course_id] = ['A', 'B']
+            for course in courses:
+                if course.capacity > max_room_capacity:
+                    sections[course.course_id] = ['A', 'B']
                 else:
-                    sections[course_id] = ['A']
-            
-            # Identify common electives across specific sections (CSE 2A/2B, CSE 6A/6B)
-            elective_schedules = {}  # {course_code_type: (day, start_slot, faculty_ids)}
-            elective_courses = courses[courses['COMBINED'] == True]
-            
+                    sections[course.course_id] = ['A']
+
             # Create timetables for each section
             section_timetables = {}
-            for section in set(sum(sections.values(), [])):
+            for section in sorted(set(sum(sections.values(), []))):
                 section_timetables[section] = {
-                    'timetable': {day: {slot: {'type': None, 'code': '', 'name': '', 'faculty': '', 'classroom': ''} 
-                                for slot in range(len(TIME_SLOTS))} for day in range(len(DAYS))},
+                    'timetable': empty_timetable(inputs['calendar']),
                     'course_days': {}
                 }
-            
-            # Schedule common electives first
-            elective_baskets = elective_courses['COURSE_CODE'].unique()
-            for basket in elective_baskets:
-                basket_courses = courses[courses['COURSE_CODE'] == basket]
-                for _, course in basket_courses.iterrows():
-                    course_id = course['COURSE_ID']
-                    code = str(course['COURSE_CODE'])
-                    name = str(course['COURSE_NAME'])
-                    faculty_ids = str(course['FACULTY_ID'])
-                    faculty = get_faculty_name(faculty_ids, code)
-                    capacity = course['CAPACITY']
-                    l = int(course['L']) if pd.notna(course['L']) else 0
-                    t = int(course['T']) if pd.notna(course['T']) else 0
-                    p = int(course['P']) if pd.notna(course['P']) else 0
-                    
-                    # Determine sections for this course
-                    course_sections = sections[course_id]
-                    if not course_sections:
-                        continue
-                    
-                    # Identify specific section pairs for synchronization
-                    target_sections = []
-                    if department == 'CSE' and semester == 2 and 'A' in course_sections and 'B' in course_sections:
-                        target_sections = ['A', 'B']  # CSE 2A and 2B
-                    elif department == 'CSE' and semester == 6 and 'A' in course_sections and 'B' in course_sections:
-                        target_sections = ['A', 'B']  # CSE 6A and 6B
-                    
-                    if target_sections:
-                        # Schedule once for the target sections
-                        if code not in [k.split('_')[0] for k in elective_schedules.keys()]:
-                            # Schedule lectures
-                            for _ in range(l):
-                                scheduled = False
-                                attempts = 0
-                                while not scheduled and attempts < max_attempts:
-                                    day = random.randint(0, len(DAYS)-1)
-                                    start_slot = random.randint(0, len(TIME_SLOTS)-LECTURE_DURATION)
-                                    slots_free = True
-                                    for i in range(LECTURE_DURATION):
-                                        if is_break_time(TIME_SLOTS[start_slot+i]):
-                                            slots_free = False
-                                            break
-                                        for section in target_sections:
-                                            if (section_timetables[section]['timetable'][day][start_slot+i]['type'] is not None):
-                                                slots_free = False
-                                                break
-                                    if not slots_free:
-                                        attempts += 1
-                                        continue
-                                    
-                                    section_rooms = {}
-                                    all_rooms_assigned = True
-                                    for section in target_sections:
-                                        section_capacity = capacity // len(target_sections)
-                                        room_id, classroom = assign_room(section_capacity, False, classroom_schedule, day, start_slot, LECTURE_DURATION)
-                                        if room_id is None:
-                                            all_rooms_assigned = False
-                                            break
-                                        section_rooms[section] = (room_id, classroom)
-                                    
-                                    if all_rooms_assigned:
-                                        slots_free = True
-                                        for fid in faculty_ids.split(';'):
-                                            if fid not in professor_schedule:
-                                                professor_schedule[fid] = {d: set() for d in range(len(DAYS))}
-                                            for i in range(LECTURE_DURATION):
-                                                if start_slot+i in professor_schedule[fid][day]:
-                                                    slots_free = False
-                                                    break
-                                        if slots_free:
-                                            print(f"Scheduling lecture {code} on {DAYS[day]} at {TIME_SLOTS[start_slot][0]} for sections {target_sections}")
-                                            elective_schedules[f"{code}_LEC"] = (day, start_slot, faculty_ids)
-                                            for section in target_sections:
-                                                timetable = section_timetables[section]['timetable']
-                                                room_id, classroom = section_rooms[section]
-                                                for i in range(LECTURE_DURATION):
-                                                    timetable[day][start_slot+i]['type'] = 'LEC'
-                                                    timetable[day][start_slot+i]['code'] = code if i == 0 else ''
-                                                    timetable[day][start_slot+i]['name'] = name if i == 0 else ''
-                                                    timetable[day][start_slot+i]['faculty'] = faculty if i == 0 else ''
-                                                    timetable[day][start_slot+i]['classroom'] = classroom if i == 0 else ''
-                                                    classroom_schedule[room_id][day].add(start_slot+i)
-                                                section_timetables[section]['course_days'].setdefault(course_id, set()).add(day)
-                                            for fid in faculty_ids.split(';'):
-                                                for i in range(LECTURE_DURATION):
-                                                    professor_schedule[fid][day].add(start_slot+i)
-                                            scheduled = True
-                                    attempts += 1
-                                    if attempts >= max_attempts:
-                                        print(f"Failed to schedule lecture {code} after {max_attempts} attempts due to room/faculty conflicts")
-                            
-                            # Schedule tutorials
-                            for _ in range(t):
-                                scheduled = False
-                                attempts = 0
-                                while not scheduled and attempts < max_attempts:
-                                    day = random.randint(0, len(DAYS)-1)
-                                    start_slot = random.randint(0, len(TIME_SLOTS)-TUTORIAL_DURATION)
-                                    slots_free = True
-                                    max_tut_days = 3  # Allow up to 3 days for tutorials
-                                    if course_id in section_timetables[section]['course_days'] and len(section_timetables[section]['course_days'][course_id]) >= max_tut_days:
-                                        break  # Skip if max tutorial days reached
-                                    for i in range(TUTORIAL_DURATION):
-                                        if is_break_time(TIME_SLOTS[start_slot+i]):
-                                            slots_free = False
-                                            break
-                                        if timetable[day][start_slot+i]['type'] is not None:
-                                            slots_free = False
-                                            break
-                                    if not slots_free:
-                                        attempts += 1
-                                        continue
-                                    
-                                    room_id, classroom = assign_room(capacity // len(course_sections), False, classroom_schedule, day, start_slot, TUTORIAL_DURATION)
-                                    if room_id is None:
-                                        attempts += 1
-                                        continue
-                                    
-                                    slots_free = True
-                                    for fid in faculty_ids.split(';'):
-                                        if fid not in professor_schedule:
-                                            professor_schedule[fid] = {d: set() for d in range(len(DAYS))}
-                                        for i in range(TUTORIAL_DURATION):
-                                            if start_slot+i in professor_schedule[fid][day]:
-                                                slots_free = False
-                                                break
-                                    if slots_free:
-                                        print(f"Scheduling tutorial {code} on {DAYS[day]} at {TIME_SLOTS[start_slot][0]} for section {section}")
-                                        for i in range(TUTORIAL_DURATION):
-                                            timetable[day][start_slot+i]['type'] = 'TUT'
-                                            timetable[day][start_slot+i]['code'] = code if i == 0 else ''
-                                            timetable[day][start_slot+i]['name'] = name if i == 0 else ''
-                                            timetable[day][start_slot+i]['faculty'] = faculty if i == 0 else ''
-                                            timetable[day][start_slot+i]['classroom'] = classroom if i == 0 else ''
-                                            classroom_schedule[room_id][day].add(start_slot+i)
-                                        section_timetables[section]['course_days'].setdefault(course_id, set()).add(day)
-                                        for fid in faculty_ids.split(';'):
-                                            for i in range(TUTORIAL_DURATION):
-                                                professor_schedule[fid][day].add(start_slot+i)
-                                        scheduled = True
-                                    attempts += 1
-                                    if attempts >= max_attempts:
-                                        print(f"Failed to schedule tutorial {code} for section {section} after {max_attempts} attempts due to room/faculty conflicts")
-                            
-                            # Schedule labs with strength division
-                            if p > 0:
-                                batch_size = capacity // 2
-                                scheduled = False
-                                attempts = 0
-                                while not scheduled and attempts < max_attempts:
-                                    day = random.randint(0, len(DAYS)-1)
-                                    start_slot = random.randint(0, len(TIME_SLOTS)-LAB_DURATION)
-                                    slots_free = True
-                                    for i in range(LAB_DURATION):
-                                        if is_break_time(TIME_SLOTS[start_slot+i]):
-                                            slots_free = False
-                                            break
-                                        for section in target_sections:
-                                            if (section_timetables[section]['timetable'][day][start_slot+i]['type'] is not None):
-                                                slots_free = False
-                                                break
-                                    if not slots_free:
-                                        attempts += 1
-                                        continue
-                                    
-                                    room1_id, room1_no = assign_room(batch_size, True, classroom_schedule, day, start_slot, LAB_DURATION)
-                                    room2_id, room2_no = assign_room(batch_size, True, classroom_schedule, day, start_slot, LAB_DURATION)
-                                    if room1_id is None or room2_id is None or room1_id == room2_id:
-                                        attempts += 1
-                                        continue
-                                    
-                                    slots_free = True
-                                    for fid in faculty_ids.split(';'):
-                                        if fid not in professor_schedule:
-                                            professor_schedule[fid] = {d: set() for d in range(len(DAYS))}
-                                        for i in range(LAB_DURATION):
-                                            if start_slot+i in professor_schedule[fid][day]:
-                                                slots_free = False
-                                                break
-                                    if not slots_free:
-                                        attempts += 1
-                                        continue
-                                    
-                                    print(f"Scheduling lab {code} on {DAYS[day]} at {TIME_SLOTS[start_slot][0]} with rooms {room1_no} and {room2_no} for sections {target_sections}")
-                                    elective_schedules[f"{code}_LAB"] = (day, start_slot, faculty_ids)
-                                    for section in target_sections:
-                                        timetable = section_timetables[section]['timetable']
-                                        room_id = room1_id if section == target_sections[0] else room2_id
-                                        classroom = room1_no if section == target_sections[0] else room2_no
-                                        for i in range(LAB_DURATION):
-                                            timetable[day][start_slot+i]['type'] = 'LAB'
-                                            timetable[day][start_slot+i]['code'] = code if i == 0 else ''
-                                            timetable[day][start_slot+i]['name'] = name if i == 0 else ''
-                                            timetable[day][start_slot+i]['faculty'] = faculty if i == 0 else ''
-                                            timetable[day][start_slot+i]['classroom'] = classroom if i == 0 else ''
-                                            classroom_schedule[room_id][day].add(start_slot+i)
-                                        section_timetables[section]['course_days'].setdefault(course_id, set()).add(day)
-                                    for fid in faculty_ids.split(';'):
-                                        for i in range(LAB_DURATION):
-                                            professor_schedule[fid][day].add(start_slot+i)
-                                    scheduled = True
-                                    attempts += 1
-                                    if attempts >= max_attempts:
-                                        print(f"Failed to schedule lab {code} after {max_attempts} attempts due to room/faculty conflicts")
-            
-            # Schedule core courses for each section
-            core_courses = courses[courses['COMBINED'] == False]
-            for section in section_timetables:
-                timetable = section_timetables[section]['timetable']
-                course_days = section_timetables[section]['course_days']
-                
-                for _, course in core_courses.iterrows():
-                    course_id = course['COURSE_ID']
-                    code = str(course['COURSE_CODE'])
-                    name = str(course['COURSE_NAME'])
-                    faculty_ids = str(course['FACULTY_ID'])
-                    faculty = get_faculty_name(faculty_ids, code)
-                    capacity = course['CAPACITY']
-                    l = int(course['L']) if pd.notna(course['L']) else 0
-                    t = int(course['T']) if pd.notna(course['T']) else 0
-                    p = int(course['P']) if pd.notna(course['P']) else 0
-                    
-                    if section not in sections[course_id]:
+
+            requests = build_session_requests(department, semester, courses, sections, inputs, baskets)
+            groups.append({'department': department, 'semester': semester,
+                           'section_timetables': section_timetables, 'requests': requests})
+    return groups
+
+def partition_groups(groups, inputs):
+    # Conflict graph of groups: two groups are coupled when they share a faculty member,
+    # an eligible room or an elective basket. Returns the connected components as lists of group indexes,
+    # in the order of their first group. Candidate rooms are shared tuples of the room
+    # index, so each distinct tuple links its rooms once and later requests link to it.
+    parent = list(range(len(groups)))
+
+    def find(idx):
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    owner = {}
+    for idx, group in enumerate(groups):
+        for request in group['requests']:
+            resources = [('faculty', fid) for fid in request['faculty_ids']]
+            if request.get('basket'):
+                resources.append(('basket', request['basket']))
+            candidates = request_rooms(inputs, request)
+            if ('rooms', id(candidates)) not in owner:
+                resources += [('room', room[0]) for room in candidates]
+            resources.append(('rooms', id(candidates)))
+            for resource in resources:
+                root_a, root_b = find(owner.setdefault(resource, idx)), find(idx)
+                if root_a != root_b:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    components = {}
+    for idx in range(len(groups)):
+        components.setdefault(find(idx), []).append(idx)
+    return list(components.values())
+
+def schedule_component(groups, inputs, engine, time_limit, seed, profile=False):
+    # Schedule coupled groups jointly against their own occupancy index: first the
+    # basket sessions they share, then each group's own requests in order
+    random.seed(seed)
+    occupancy = new_occupancy(inputs)
+    scheduler = SCHEDULERS[engine]
+    states = [{'inputs': inputs, 'calendar': inputs['calendar'], 'occupancy': occupancy,
+               'group': (group['department'], group['semester']),
+               'section_timetables': group['section_timetables'], 'stats': new_stats(profile)}
+              for group in groups]
+    copies = [(g, idx) for g, group in enumerate(groups)
+              for idx, request in enumerate(group['requests']) if request.get('basket')]
+    joint = dict(zip(copies, schedule_baskets([(g, groups[g]['requests'][idx]) for g, idx in copies], states)))
+    for g, (group, state) in enumerate(zip(groups, states)):
+        started = perf_counter()
+        placed = iter(scheduler([request for request in group['requests'] if not request.get('basket')],
+                                state, time_limit))
+        group['results'] = [(request, *joint[(g, idx)]) if request.get('basket') else next(placed)
+                            for idx, request in enumerate(group['requests'])]
+        if profile:
+            state['stats']['seconds'] = perf_counter() - started
+        group['stats'] = state['stats']
+    return groups, occupancy
+
+def new_result(inputs, seed, engine, groups, occupancy, components):
+    # A run carries the room table, faculty names, calendar and input snapshot it was made
+    # from, so it can be exported or saved without the inputs
+    return {'seed': seed, 'engine': engine, 'groups': groups, 'occupancy': occupancy, 'components': components,
+            'rooms': inputs['rooms_by_id'], 'faculty_names': inputs['faculty_names'],
+            'calendar': inputs['calendar'], 'snapshot': inputs['snapshot']}
+
+def schedule_all(inputs, engine='greedy', time_limit=BACKTRACK_TIME_LIMIT, seed=None, workers=1, profile=False):
+    # One scheduling pass over every department and semester. Independent components are
+    # run in worker processes when workers != 1; each gets its own seed derived from
+    # `seed`, so the same seed reproduces the same schedule either way.
+    groups = plan_groups(inputs)
+    components = partition_groups(groups, inputs)
+    jobs = [([groups[idx] for idx in component], inputs, engine, time_limit,
+             None if seed is None else f"{seed}/{number}", profile)
+            for number, component in enumerate(components)]
+    if workers != 1 and len(components) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(schedule_component, *zip(*jobs)))
+    else:
+        outputs = [schedule_component(*job) for job in jobs]
+
+    # Components share no faculty, rooms or sections, so their masks merge by OR (each one
+    # also holds the preloaded unavailable slots)
+    occupancy = new_occupancy(inputs)
+    for component, (component_groups, component_occupancy) in zip(components, outputs):
+        for idx, group in zip(component, component_groups):
+            groups[idx] = group
+        for kind in OCCUPANCY_KINDS:
+            for key, day_masks in component_occupancy[kind].items():
+                for day, mask in enumerate(day_masks):
+                    occupy(occupancy, kind, key, day, mask, len(day_masks))
+    return new_result(inputs, seed, engine, groups, occupancy, len(components))
+
+def score_schedule(result):
+    # Lower is better: (unplaced sessions, idle section slots between classes, -seat utilisation)
+    break_mask = result['calendar']['break_mask']
+    unplaced = 0
+    seats = 0
+    room_seats = 0
+    for group in result['groups']:
+        for request, placement, _ in group['results']:
+            if placement is None:
+                unplaced += 1
+                continue
+            rooms = placement[2]
+            seats += request.get('students', request['room_capacity'] * len(rooms)) * request['duration']
+            room_seats += sum(room[2] for room in rooms) * request['duration']
+    gaps = sum(section_day_gaps(mask, break_mask)
+               for masks in result['occupancy']['section'].values() for mask in masks)
+    utilisation = seats / room_seats if room_seats else 0.0
+    return (unplaced, gaps, -round(utilisation, 4))
+
+def multi_start(inputs, starts, engine='greedy', time_limit=BACKTRACK_TIME_LIMIT, seed=0, workers=None,
+                profile=False):
+    # Run independent passes with seeds seed, seed+1, ... on all cores and keep the best
+    seeds = [seed + i for i in range(starts)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(schedule_all, [inputs] * starts, [engine] * starts, [time_limit] * starts, seeds,
+                                [1] * starts, [profile] * starts))
+    for result in results:
+        unplaced, gaps, utilisation = score_schedule(result)
+        logger.info("Seed %s: %d unplaced, %d idle slots, %.1f%% seat utilisation",
+                    result['seed'], unplaced, gaps, -utilisation * 100)
+    return min(results, key=score_schedule)
+
+# Local search: after a run, move sessions to other windows, place unplaced sessions and
+# bump a single blocking session to make room for them, accepting a worse timetable with
+# a probability that falls over the budget (simulated annealing). Every move uses the
+# same checks as the engines, so breaks, clashes and day rules hold throughout; only the
+# soft cost below changes, and each move re-scores just the section-days it touches.
+IMPROVE_TIME_LIMIT = 2.0  # seconds for --improve without a value
+UNPLACED_WEIGHT = 1000    # one unplaced session outweighs every soft cost
+GAP_WEIGHT = 1            # per idle slot between two classes of a section on a day
+CLUSTER_WEIGHT = 2        # per extra session of a course on a day the section already has it
+WASTE_WEIGHT = 0.01       # per empty seat in the assigned rooms
+START_TEMPERATURE = 2.0
+END_TEMPERATURE = 0.05
+
+def section_day_gaps(mask, break_mask):
+    # Idle non-break slots between the first and last busy slot of one section-day
+    if not mask:
+        return 0
+    span = (1 << mask.bit_length()) - (mask & -mask)
+    return bin(span & ~mask & ~break_mask).count('1')
+
+def improve_schedule(result, inputs, time_limit=IMPROVE_TIME_LIMIT, max_moves=None, seed=None):
+    # Improve `result` in place. With max_moves the temperature follows the move count, so
+    # the same seed gives the same timetable; otherwise it follows the clock.
+    rng = random.Random(seed)
+    calendar = result['calendar']
+    break_mask = calendar['break_mask']
+    num_slots = len(calendar['slots'])
+    num_days = len(calendar['days'])
+    occupancy = result['occupancy']
+    groups = result['groups']
+    states = [{'inputs': inputs, 'calendar': calendar, 'occupancy': occupancy,
+               'group': (group['department'], group['semester']),
+               'section_timetables': group['section_timetables'], 'stats': group.get('stats') or new_stats()}
+              for group in groups]
+    requests = [[request for request, _, _ in group['results']] for group in groups]
+    placements = [[placement for _, placement, _ in group['results']] for group in groups]
+    # Basket sessions are placed jointly across groups and stay where they are
+    entries = [(g, idx) for g, group_requests in enumerate(requests) for idx, request in enumerate(group_requests)
+               if not request.get('basket')]
+    if not entries:
+        return
+    # Sessions per (department, semester, section, course_id, type, day): summed over the
+    # types for the clustering term, and per type for whether a day stays in the section's
+    # `course_days` when a session leaves it
+    course_sessions = {}
+
+    def course_keys(g, request, day):
+        return [states[g]['group'] + (section,) + day_key(request) + (day,) for section in request['sections']]
+
+    def place(g, idx, placement):
+        request = requests[g][idx]
+        commit_session(request, states[g], *placement)
+        for key in course_keys(g, request, placement[0]):
+            course_sessions[key] = course_sessions.get(key, 0) + 1
+        placements[g][idx] = placement
+
+    def unplace(g, idx):
+        request = requests[g][idx]
+        day, start_slot, rooms = placements[g][idx]
+        timetables = states[g]['section_timetables']
+        remaining = []
+        for section, key in zip(request['sections'], course_keys(g, request, day)):
+            course_sessions[key] -= 1
+            days = set(timetables[section]['course_days'].get(day_key(request), ()))
+            if not course_sessions[key]:
+                days.discard(day)
+            remaining.append(days)
+        undo_session(request, states[g], day, start_slot, rooms, remaining)
+        placements[g][idx] = None
+
+    for g, idx in entries:
+        if placements[g][idx]:
+            for key in course_keys(g, requests[g][idx], placements[g][idx][0]):
+                course_sessions[key] = course_sessions.get(key, 0) + 1
+
+    def cost(placed):
+        # Soft cost of the sections and courses of the given sessions over the whole week,
+        # plus their room waste or unplaced penalty
+        section_masks = occupancy['section']
+        sections = set()
+        courses = set()
+        total = 0
+        for g, idx in placed:
+            request = requests[g][idx]
+            for section in request['sections']:
+                sections.add(states[g]['group'] + (section,))
+                courses.add(states[g]['group'] + (section, request['course_id']))
+            placement = placements[g][idx]
+            if placement is None:
+                total += UNPLACED_WEIGHT
+            else:
+                total += WASTE_WEIGHT * (sum(room[2] for room in placement[2])
+                                         - request.get('students', request['room_capacity'] * len(placement[2])))
+        for key in sections:
+            masks = section_masks.get(key)
+            if masks:
+                total += GAP_WEIGHT * sum(section_day_gaps(mask, break_mask) for mask in masks)
+        for key in courses:
+            total += CLUSTER_WEIGHT * sum(max(0, sum(course_sessions.get(key + (session_type, day), 0)
+                                                     for session_type in SESSION_NAMES) - 1)
+                                          for day in range(num_days))
+        return total
+
+    def pick_rooms(request, rooms):
+        # Best fit (rooms come sorted by capacity) or a random choice, to explore both
+        if rng.random() < 0.5:
+            return rooms[:request['rooms_needed']]
+        return rng.sample(rooms, request['rooms_needed'])
+
+    def open_starts(g, request, day):
+        starts = (calendar['starts'][request['duration']]
+                  & free_window_starts(busy_mask(occupancy, 'faculty', request['faculty_ids'], day),
+                                       request['duration'], num_slots))
+        return faculty_load_starts(inputs, occupancy, request['faculty_ids'], day, request['duration'], starts)
+
+    def random_window(g, idx):
+        # A random feasible (day, start_slot, rooms) on one allowed day, or None
+        request = requests[g][idx]
+        days = allowed_days(request, states[g])
+        if not days:
+            return None
+        day = rng.choice(days)
+        starts = open_starts(g, request, day) & free_window_starts(
+            busy_mask(occupancy, 'section', request_section_keys(request, states[g]), day),
+            request['duration'], num_slots)
+        if not starts:
+            return None
+        start_slot = rng.choice([s for s in range(num_slots) if starts >> s & 1])
+        rooms = usable_rooms(request, free_rooms(request_rooms(inputs, request), occupancy, day, start_slot,
+                                                 request['duration']))
+        if rooms is None:
+            return None
+        return (day, start_slot, pick_rooms(request, rooms))
+
+    def relocate(g, idx):
+        # Move a placed session, or place an unplaced one, in a random window
+        old = placements[g][idx]
+        before = cost([(g, idx)])
+        if old:
+            unplace(g, idx)
+        new = random_window(g, idx)
+        if new is None:
+            if old:
+                place(g, idx, old)
+            return None
+        place(g, idx, new)
+
+        def undo():
+            unplace(g, idx)
+            if old:
+                place(g, idx, old)
+        return cost([(g, idx)]) - before, undo
+
+    def bump(g, idx):
+        # Place an unplaced session over the one session of its group that blocks a
+        # random window, then re-place that session anywhere it fits
+        request = requests[g][idx]
+        days = allowed_days(request, states[g])
+        if not days:
+            return None
+        day = rng.choice(days)
+        starts = open_starts(g, request, day)
+        if not starts:
+            return None
+        start_slot = rng.choice([s for s in range(num_slots) if starts >> s & 1])
+        mask = window_mask(start_slot, request['duration'])
+        sections = set(request['sections'])
+        blockers = [j for j, placement in enumerate(placements[g])
+                    if placement and placement[0] == day and not requests[g][j].get('basket')
+                    and sections & set(requests[g][j]['sections'])
+                    and window_mask(placement[1], requests[g][j]['duration']) & mask]
+        if len(blockers) != 1:
+            return None
+        other = blockers[0]
+        old = placements[g][other]
+        before = cost([(g, idx), (g, other)])
+        unplace(g, other)
+        rooms = usable_rooms(request, free_rooms(request_rooms(inputs, request), occupancy, day, start_slot,
+                                                 request['duration']))
+        if rooms is None or not window_available(request, states[g], day, start_slot, []):
+            place(g, other, old)
+            return None
+        place(g, idx, (day, start_slot, pick_rooms(request, rooms)))
+        candidates = find_feasible_slots(requests[g][other], states[g], allowed_days(requests[g][other], states[g]))
+        if candidates:
+            new_day, new_start, free = rng.choice(candidates)
+            place(g, other, (new_day, new_start, pick_rooms(requests[g][other], free)))
+
+        def undo():
+            unplace(g, idx)
+            if placements[g][other]:
+                unplace(g, other)
+            place(g, other, old)
+        return cost([(g, idx), (g, other)]) - before, undo
+
+    def unmet():
+        # Unplaced sessions and their slots; the search must not end above where it started
+        missing = [requests[g][idx]['duration'] for g, idx in entries if placements[g][idx] is None]
+        return len(missing), sum(missing)
+
+    initial = {(g, idx): placements[g][idx] for g, idx in entries}
+    unmet_before = unmet()
+    score_before = score_schedule(result)
+    started = monotonic()
+    moves = accepted = 0
+    while True:
+        elapsed = monotonic() - started
+        if elapsed >= time_limit or (max_moves is not None and moves >= max_moves):
+            break
+        progress = moves / max_moves if max_moves else elapsed / time_limit
+        temperature = START_TEMPERATURE * (END_TEMPERATURE / START_TEMPERATURE) ** progress
+        moves += 1
+        g, idx = rng.choice(entries)
+        move = relocate(g, idx)
+        if move is None and placements[g][idx] is None:
+            move = bump(g, idx)
+        if move is None:
+            continue
+        delta, undo = move
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            accepted += 1
+        else:
+            undo()
+
+    unmet_after = unmet()
+    if unmet_after[0] > unmet_before[0] or unmet_after[1] > unmet_before[1]:
+        # Rare (a bump can trade a long session for a short one): go back to the start
+        logger.info("Local search: %d unplaced session(s) of %d slots is worse than the %d of %d it started from; "
+                    "keeping the starting timetable", *unmet_after, *unmet_before)
+        moved = [(g, idx) for g, idx in entries if placements[g][idx] != initial[(g, idx)]]
+        for g, idx in moved:
+            if placements[g][idx]:
+                unplace(g, idx)
+        for g, idx in moved:
+            if initial[(g, idx)]:
+                place(g, idx, initial[(g, idx)])
+
+    for g, group in enumerate(groups):
+        group['results'] = [(request, placement, None if placement else
+                             diagnose(request, states[g], allowed_days(request, states[g])))
+                            for request, placement in zip(requests[g], placements[g])]
+    unplaced, gaps, utilisation = score_schedule(result)
+    logger.info("Local search: %d of %d moves accepted in %.1fs; unplaced %d -> %d, idle slots %d -> %d, "
+                "seat utilisation %.1f%% -> %.1f%%", accepted, moves, monotonic() - started, score_before[0],
+                unplaced, score_before[1], gaps, -score_before[2] * 100, -utilisation * 100)
+
+HEADER_FILL = "FFD700"
+BREAK_FILL = "D3D3D3"
+SESSION_FILLS = {'LEC': "E6E6FA", 'LAB': "98FB98", 'TUT': "FFE4E1"}
+
+def add_timetable_styles(wb):
+    # Named styles are registered once per workbook and shared by every cell using them
+    from openpyxl.styles import PatternFill, Border, Side, Alignment, Font, NamedStyle
+    border = Border(left=Side(style='thin'), right=Side(style='thin'),
+                    top=Side(style='thin'), bottom=Side(style='thin'))
+    alignment = Alignment(wrap_text=True, vertical='center', horizontal='center')
+    wb.add_named_style(NamedStyle('timetable_header', font=Font(bold=True),
+                                  fill=PatternFill(start_color=HEADER_FILL, end_color=HEADER_FILL, fill_type="solid"),
+                                  alignment=Alignment(horizontal='center', vertical='center')))
+    wb.add_named_style(NamedStyle('timetable_cell', border=border, alignment=alignment))
+    fills = [('BREAK', BREAK_FILL)] + list(SESSION_FILLS.items())
+    for name, color in fills:
+        wb.add_named_style(NamedStyle(f'timetable_{name}', border=border, alignment=alignment,
+                                      fill=PatternFill(start_color=color, end_color=color, fill_type="solid")))
+
+def styled_cell(ws, value, style):
+    from openpyxl.cell import WriteOnlyCell
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+def write_timetable_sheet(wb, title, timetable, calendar):
+    # Rows are streamed to disk as they are appended; column widths and row heights
+    # must be set before the first row in write-only mode
+    from openpyxl.utils import get_column_letter
+    break_slots = calendar['break_slots']
+    ws = wb.create_sheet(title=title)
+    for col_idx in range(1, len(calendar['slots'])+2):
+        ws.column_dimensions[get_column_letter(col_idx)].width = 15
+    for row_num in range(2, len(calendar['days'])+2):
+        ws.row_dimensions[row_num].height = 40
+
+    header = ['Day'] + calendar['labels']
+    ws.append([styled_cell(ws, value, 'timetable_header') for value in header])
+
+    for day_idx, day in enumerate(calendar['days']):
+        row_num = day_idx + 2
+        row = [day]
+        for slot_idx in range(len(calendar['slots'])):
+            cell_value = ''
+            style = 'timetable_cell'
+            entry = timetable[day_idx][slot_idx]
+            if slot_idx in break_slots:
+                cell_value = "BREAK"
+                style = 'timetable_BREAK'
+            elif entry['type'] and entry['code']:
+                activity_type = entry['type']
+                style = f'timetable_{activity_type}'
+                start_col = get_column_letter(slot_idx + 2)
+                end_col = get_column_letter(slot_idx + calendar['durations'][activity_type] + 1)
+                ws.merged_cells.add(f"{start_col}{row_num}:{end_col}{row_num}")
+                rooms = entry['classroom']
+                if entry.get('batches'):
+                    rooms = ', '.join(f"B{n} {room} ({size})" for n, (room, size) in enumerate(entry['batches'], 1))
+                cell_value = f"{entry['code']} {activity_type}\n{rooms}"
+            row.append(styled_cell(ws, cell_value, style))
+        ws.append(row)
+
+def build_resource_views(result):
+    # One pass over the placed sessions: {'faculty': {fid: [session, ...]}, 'room': {room_id: [...]}}.
+    # A basket session is listed once per member, with that member's faculty and room, and
+    # names every group taking it; its copies in the other groups only add their label.
+    views = {'faculty': {}, 'room': {}}
+    baskets = {}
+    for group in result['groups']:
+        for request, placement, _ in group['results']:
+            if not placement:
+                continue
+            day, start_slot, rooms = placement
+            label = (group['department'], group['semester'], request['sections'])
+            session = {'groups': [label], 'type': request['type'], 'code': request['code'], 'name': request['name'],
+                       'faculty': request['faculty'], 'students': request['room_capacity'], 'day': day,
+                       'start_slot': start_slot, 'duration': request['duration'], 'rooms': rooms}
+            if not request.get('basket'):
+                for fid in request['faculty_ids']:
+                    views['faculty'].setdefault(fid, []).append(session)
+                if 'students' in request:
+                    for room, students in zip(rooms, batch_sizes(rooms, request['students'])):
+                        views['room'].setdefault(room[0], []).append(dict(session, students=students))
+                    continue
+                for room in rooms:
+                    views['room'].setdefault(room[0], []).append(session)
+                continue
+            key = basket_session_key(request) + (day, start_slot)
+            if key in baskets:
+                for member in baskets[key]:
+                    member['groups'].append(label)
+                continue
+            baskets[key] = []
+            per_member = len(rooms) // len(request['members'])
+            for n, (name, fids) in enumerate(request['members']):
+                member = dict(session, groups=[label], name=name, rooms=rooms[n * per_member:(n + 1) * per_member],
+                              faculty=get_faculty_name(result['faculty_names'], fids))
+                baskets[key].append(member)
+                for fid in fids:
+                    views['faculty'].setdefault(fid, []).append(member)
+                for room in member['rooms']:
+                    views['room'].setdefault(room[0], []).append(member)
+            # Faculty booked from the course rows rather than a member teach the whole basket
+            member_ids = {fid for _, fids in request['members'] for fid in fids}
+            extra = [fid for fid in request['faculty_ids'] if fid not in member_ids]
+            if extra:
+                session = dict(session, groups=[label], faculty=get_faculty_name(result['faculty_names'], extra))
+                baskets[key].append(session)
+                for fid in extra:
+                    views['faculty'].setdefault(fid, []).append(session)
+    return views
+
+def session_label(session):
+    return ', '.join(f"{department} {semester} {'/'.join(sections)}" for department, semester, sections
+                     in session['groups'])
+
+def view_timetable(sessions, detail, calendar):
+    # Section-style grid for one faculty member or room; `detail` gives the second line
+    timetable = {day: {slot: {'type': None, 'code': '', 'classroom': ''} for slot in range(len(calendar['slots']))}
+                 for day in range(len(calendar['days']))}
+    for session in sessions:
+        for i in range(session['duration']):
+            entry = timetable[session['day']][session['start_slot'] + i]
+            entry['type'] = session['type']
+            entry['code'] = session['code'] if i == 0 else ''
+            entry['classroom'] = detail(session) if i == 0 else ''
+    return timetable
+
+def room_utilisation(views, rooms_by_id, calendar):
+    # Per room: booked teaching slots out of all non-break slots in the week, and the
+    # average share of its seats taken by the sessions held there
+    teaching_slots = len(calendar['days']) * calendar['teaching_slots']
+    rows = []
+    for room_id, room in sorted(rooms_by_id.items()):
+        sessions = views['room'].get(room_id, [])
+        booked = sum(session['duration'] for session in sessions)
+        seat_fill = (sum(min(session['students'], room[2]) / room[2] for session in sessions) / len(sessions)
+                     if sessions else 0.0)
+        rows.append([room[1], room[3], room[2], len(sessions), booked, teaching_slots,
+                     round(booked / teaching_slots, 3), round(seat_fill, 3)])
+    return rows
+
+UTILISATION_HEADER = ['Room', 'Type', 'Capacity', 'Sessions', 'Booked slots', 'Teaching slots',
+                      'Utilisation', 'Average seat fill']
+
+def sheet_title(title):
+    # Excel sheet names: at most 31 characters, none of []:*?/\
+    return ''.join('_' if ch in '[]:*?/\\' else ch for ch in title)[:31]
+
+def write_resource_sheets(wb, views, result):
+    from openpyxl.utils import get_column_letter
+    rooms_by_id = result['rooms']
+    calendar = result['calendar']
+    for fid, sessions in sorted(views['faculty'].items()):
+        timetable = view_timetable(sessions, lambda s: f"{'/'.join(room[1] for room in s['rooms'])} {session_label(s)}",
+                                   calendar)
+        write_timetable_sheet(wb, sheet_title(f"FAC_{fid} {faculty_name(result['faculty_names'], fid)}"), timetable,
+                              calendar)
+    for room_id, sessions in sorted(views['room'].items()):
+        timetable = view_timetable(sessions, session_label, calendar)
+        write_timetable_sheet(wb, sheet_title(f"ROOM_{rooms_by_id[room_id][1]}"), timetable, calendar)
+
+    ws = wb.create_sheet(title="Room_Utilisation")
+    for col_idx in range(1, len(UTILISATION_HEADER)+1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = 15
+    ws.append([styled_cell(ws, value, 'timetable_header') for value in UTILISATION_HEADER])
+    for row in room_utilisation(views, rooms_by_id, calendar):
+        ws.append(row)
+
+VIEW_CSV_FILES = ('faculty_timetables.csv', 'room_timetables.csv', 'room_utilisation.csv')
+
+def write_view_csvs(views, result, directory="."):
+    # Lightweight alternative to the view sheets: one row per session per faculty member / room
+    rooms_by_id = result['rooms']
+    calendar = result['calendar']
+
+    def slot_range(session):
+        return (minutes_label(calendar['slots'][session['start_slot']][0]),
+                minutes_label(calendar['slots'][session['start_slot'] + session['duration'] - 1][1]))
+
+    columns = ['day', 'start', 'end', 'type', 'code', 'name', 'department', 'semester', 'sections']
+
+    def session_row(session):
+        # A basket session taken by several groups lists them separated by ';'
+        labels = session['groups']
+        return [calendar['days'][session['day']], *slot_range(session), session['type'], session['code'], session['name'],
+                ';'.join(str(label[0]) for label in labels), ';'.join(str(label[1]) for label in labels),
+                ';'.join('/'.join(label[2]) for label in labels)]
+
+    faculty_path, room_path, utilisation_path = (os.path.join(directory, name) for name in VIEW_CSV_FILES)
+    with open(faculty_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['faculty_id', 'faculty_name'] + columns + ['rooms'])
+        for fid, sessions in sorted(views['faculty'].items()):
+            for session in sorted(sessions, key=lambda s: (s['day'], s['start_slot'])):
+                writer.writerow([fid, faculty_name(result['faculty_names'], fid)] + session_row(session)
+                                + ['/'.join(room[1] for room in session['rooms'])])
+    with open(room_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['room', 'capacity'] + columns + ['faculty'])
+        for room_id, sessions in sorted(views['room'].items()):
+            for session in sorted(sessions, key=lambda s: (s['day'], s['start_slot'])):
+                writer.writerow([rooms_by_id[room_id][1], rooms_by_id[room_id][2]] + session_row(session)
+                                + [session['faculty']])
+    with open(utilisation_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(UTILISATION_HEADER)
+        writer.writerows(room_utilisation(views, rooms_by_id, calendar))
+    logger.info("Faculty and room views saved to %sfaculty_timetables.csv, room_timetables.csv, room_utilisation.csv",
+                os.path.join(directory, ''))
+
+def write_workbook(result, path="timetables.xlsx", views='excel'):
+    # Write-only workbook: each sheet is streamed as it is produced, so memory stays
+    # bounded however many sheets are written. views: 'excel' adds faculty, room and
+    # utilisation sheets, 'csv' writes them as CSV files next to the workbook, 'none' skips them.
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    add_timetable_styles(wb)
+
+    # Write timetables to worksheets (REQ-14)
+    for group in result['groups']:
+        for section, data in group['section_timetables'].items():
+            write_timetable_sheet(wb, f"{group['department']}_{group['semester']}_{section}", data['timetable'],
+                                  result['calendar'])
+
+    if views == 'excel':
+        write_resource_sheets(wb, build_resource_views(result), result)
+    elif views == 'csv':
+        write_view_csvs(build_resource_views(result), result, os.path.dirname(os.path.abspath(path)))
+
+    wb.save(path)
+    logger.info("Timetables saved to %s", path)
+
+# Schedule state file (JSON lines). Line 1 is a header with the format version, run
+# settings, calendar, input snapshot, room table, groups and the occupancy bitmasks; every further
+# line is one session request with its placement (day/start_slot/rooms are null and
+# 'reason' is set for unplaced sessions).
+STATE_PATH = "timetables.state.jsonl"
+STATE_FORMAT = 'timetable-state'
+STATE_VERSION = 1
+REQUEST_FIELDS = ('course_id', 'code', 'name', 'faculty_ids', 'faculty', 'type', 'duration', 'room_capacity',
+                  'is_lab', 'rooms_needed', 'sections', 'days')
+OPTIONAL_FIELDS = ('students', 'basket', 'basket_session', 'members')  # only on lab / basket sessions
+
+def plain(value):
+    # numpy scalars from pandas -> built-in Python values for JSON
+    return value.item() if hasattr(value, 'item') else value
+
+def course_key(department, semester, course_id):
+    return f"{department}|{semester}|{course_id}"
+
+def input_snapshot(courses_df, rooms_df):
+    # Normalised course and room rows to diff a later run's inputs against; courses are
+    # keyed by department, semester and id, rooms by id
+    return {'courses': {course_key(str(row['DEPARTMENT']), str(row['SEMESTER']).strip(), row['COURSE_ID']):
+                        [str(value) for value in row.values()] for row in courses_df.to_dict('records')},
+            'rooms': {str(row['id']): [str(value) for value in row.values()] for row in rooms_df.to_dict('records')}}
+
+def save_state(result, path=STATE_PATH):
+    occupancy = result['occupancy']
+    calendar = result['calendar']
+    header = {
+        'format': STATE_FORMAT, 'version': STATE_VERSION,
+        'seed': result['seed'], 'engine': result['engine'], 'components': result['components'],
+        'days': calendar['days'], 'time_slots': calendar['labels'], 'calendar': calendar['config'],
+        'inputs': result['snapshot'],
+        'rooms': {room_id: list(room[1:]) for room_id, room in result['rooms'].items()},
+        'faculty_names': result['faculty_names'],
+        'groups': [[plain(group['department']), plain(group['semester']), list(group['section_timetables'])]
+                   for group in result['groups']],
+        'occupancy': {'faculty': occupancy['faculty'], 'room': occupancy['room'],
+                      'section': [[plain(key[0]), plain(key[1]), key[2], masks]
+                                  for key, masks in occupancy['section'].items()]},
+    }
+    with open(path, 'w') as f:
+        f.write(json.dumps(header) + '\n')
+        for group in result['groups']:
+            for request, placement, reason in group['results']:
+                row = {'department': plain(group['department']), 'semester': plain(group['semester'])}
+                row.update((field, plain(request[field])) for field in REQUEST_FIELDS)
+                row.update((field, request[field]) for field in OPTIONAL_FIELDS if field in request)
+                day, start_slot, rooms = placement if placement else (None, None, [])
+                row.update(day=day, start_slot=start_slot, rooms=[room[0] for room in rooms], reason=reason)
+                f.write(json.dumps(row) + '\n')
+    logger.info("Schedule state saved to %s", path)
+
+def load_state(path=STATE_PATH):
+    # Returns {'header': {...}, 'sessions': [row, ...]} with occupancy keys restored to
+    # the in-memory form (int room ids, (department, semester, section) tuples)
+    with open(path) as f:
+        header = json.loads(f.readline())
+        if header.get('format') != STATE_FORMAT or header.get('version') != STATE_VERSION:
+            raise ValueError(f"{path} is not a version {STATE_VERSION} schedule state file")
+        sessions = [json.loads(line) for line in f]
+    occupancy = header['occupancy']
+    occupancy['room'] = {int(room_id): masks for room_id, masks in occupancy['room'].items()}
+    occupancy['section'] = {(department, semester, section): masks
+                            for department, semester, section, masks in occupancy['section']}
+    header['rooms'] = {int(room_id): (int(room_id), *record) for room_id, record in header['rooms'].items()}
+    header.setdefault('faculty_names', {})
+    return {'header': header, 'sessions': sessions}
+
+def result_from_state(saved):
+    # Rebuild a schedule_all()-style result (section timetables, results, occupancy)
+    # from a loaded state file without the CSV inputs
+    header = saved['header']
+    calendar = build_calendar(header.get('calendar'))
+    occupancy = new_occupancy()
+    groups = {}
+    for department, semester, sections in header['groups']:
+        groups[(department, semester)] = {
+            'department': department, 'semester': semester, 'requests': [], 'results': [],
+            'section_timetables': {section: {'timetable': empty_timetable(calendar), 'course_days': {}}
+                                   for section in sections}}
+    for row in saved['sessions']:
+        group = groups[(row['department'], row['semester'])]
+        request = {field: row[field] for field in REQUEST_FIELDS}
+        request.update((field, row[field]) for field in OPTIONAL_FIELDS if field in row)
+        placement = None
+        if row['day'] is not None:
+            placement = (row['day'], row['start_slot'], [header['rooms'][room_id] for room_id in row['rooms']])
+            state = {'calendar': calendar, 'occupancy': occupancy, 'group': (row['department'], row['semester']),
+                     'section_timetables': group['section_timetables']}
+            commit_session(request, state, *placement)
+        group['requests'].append(request)
+        group['results'].append((request, placement, row['reason']))
+    return {'seed': header['seed'], 'engine': header['engine'], 'groups': list(groups.values()),
+            'occupancy': occupancy, 'components': header['components'], 'rooms': header['rooms'],
+            'faculty_names': header['faculty_names'], 'calendar': calendar, 'snapshot': header['inputs']}
+
+def diff_inputs(old, new):
+    # Ids of course and room rows that were added, removed or edited
+    def changed(kind):
+        return {key for key in old[kind].keys() | new[kind].keys() if old[kind].get(key) != new[kind].get(key)}
+    return changed('courses'), changed('rooms')
+
+def window_available(request, state, day, start_slot, rooms):
+    occupancy = state['occupancy']
+    mask = window_mask(start_slot, request['duration'])
+    calendar = state['calendar']
+    if day >= len(calendar['days']) or not calendar['starts'][request['duration']] >> start_slot & 1:
+        return False
+    busy = (busy_mask(occupancy, 'section', request_section_keys(request, state), day)
+            | busy_mask(occupancy, 'faculty', request['faculty_ids'], day)
+            | busy_mask(occupancy, 'room', [room[0] for room in rooms], day))
+    return not busy & mask and bool(faculty_load_starts(state['inputs'], occupancy, request['faculty_ids'], day,
+                                                        request['duration'], 1 << start_slot))
+
+def schedule_incremental(previous, inputs, engine='greedy', time_limit=BACKTRACK_TIME_LIMIT, seed=None,
+                         profile=False):
+    # Keep every previous session whose course and rooms are unchanged, then place only
+    # the remaining sessions against that frozen timetable. Faculty name edits need no
+    # re-placement: kept sessions are re-rendered from the new course rows. Kept sessions
+    # must still fit the calendar; if the calendar changed at all (days, times, slot length
+    # or breaks) slot indices mean other clock times, so nothing is kept.
+    random.seed(seed)
+    changed_courses, changed_rooms = diff_inputs(previous['header']['inputs'], inputs['snapshot'])
+    same_calendar = build_calendar(previous['header'].get('calendar'))['config'] == inputs['calendar']['config']
+    if not same_calendar:
+        logger.info("Incremental: the calendar changed since the previous run, so every session is re-placed")
+    kept = {}
+    for session in previous['sessions']:
+        if session['day'] is None or not same_calendar:
+            continue
+        if course_key(session['department'], session['semester'], session['course_id']) in changed_courses or any(str(r) in changed_rooms for r in session['rooms']):
+            continue
+        key = (session['department'], session['semester'], session['course_id'], session['type'],
+               tuple(session['sections']))
+        kept.setdefault(key, []).append(session)
+
+    occupancy = new_occupancy(inputs)
+    scheduler = SCHEDULERS[engine]
+    groups = plan_groups(inputs)
+    states = []
+    frozen = 0
+    joint = {}  # basket session -> [(group index, request index, previous placement or None)]
+    for g, group in enumerate(groups):
+        state = {'inputs': inputs, 'calendar': inputs['calendar'], 'occupancy': occupancy,
+                 'group': (group['department'], group['semester']),
+                 'section_timetables': group['section_timetables'], 'stats': new_stats(profile)}
+        group['stats'] = state['stats']
+        states.append(state)
+        group['results'] = []
+        for idx, request in enumerate(group['requests']):
+            key = state['group'] + (int(request['course_id']), request['type'], tuple(request['sections']))
+            previous_placement = None
+            if kept.get(key):
+                session = kept[key].pop(0)
+                previous_placement = (session['day'], session['start_slot'],
+                                      [inputs['rooms_by_id'][room_id] for room_id in session['rooms']])
+            placement = None
+            if request.get('basket'):
+                joint.setdefault(basket_session_key(request), []).append((g, idx, previous_placement))
+            elif previous_placement and window_available(request, state, *previous_placement):
+                placement = previous_placement
+                commit_session(request, state, *placement)
+                frozen += 1
+            group['results'].append((request, placement, None))
+
+    # A basket session keeps its window only if every copy of it does, so copies stay together
+    pending_copies = []
+    for copies in joint.values():
+        placement = copies[0][2]
+        requests = [groups[g]['requests'][idx] for g, idx, _ in copies]
+        if placement and all(previous == placement for _, _, previous in copies) and all(
+                len(placement[2]) == request['rooms_needed'] and window_available(request, states[g], *placement)
+                for request, (g, _, _) in zip(requests, copies)):
+            for request, (g, idx, _) in zip(requests, copies):
+                commit_session(request, states[g], *placement)
+                groups[g]['results'][idx] = (request, placement, None)
+            frozen += len(copies)
+        else:
+            pending_copies += [(g, idx) for g, idx, _ in copies]
+    outcomes = schedule_baskets([(g, groups[g]['requests'][idx]) for g, idx in pending_copies], states)
+    for (g, idx), outcome in zip(pending_copies, outcomes):
+        groups[g]['results'][idx] = (groups[g]['requests'][idx], *outcome)
+
+    replaced = len(pending_copies)
+    for group, state in zip(groups, states):
+        pending = [idx for idx, (request, placement, _) in enumerate(group['results'])
+                   if placement is None and not request.get('basket')]
+        replaced += len(pending)
+        started = perf_counter()
+        for idx, outcome in zip(pending, scheduler([group['requests'][idx] for idx in pending], state, time_limit)):
+            group['results'][idx] = outcome
+        if profile:
+            state['stats']['seconds'] = perf_counter() - started
+    logger.info("Incremental: %d course(s) and %d room(s) changed; kept %d sessions, re-placed %d",
+                len(changed_courses), len(changed_rooms), frozen, replaced)
+    return new_result(inputs, seed, engine, groups, occupancy, 1)
+
+# What-if sandbox: answer "can CS164 move to Thursday?" or "what if C004 closes?" against a
+# finished schedule without touching it. open_sandbox() indexes the baseline once; every
+# what_if() call works on copy-on-write occupancy masks and day counts, so its cost
+# depends on the sessions an edit touches, not on the size of the timetable, and any
+# number of queries can share one sandbox.
+WHAT_IF_EDITS = ('block_room', 'block_faculty', 'room_capacity', 'pin')
+
+def open_sandbox(result, inputs):
+    # Placed sessions as units (a basket session is one unit for all its copies), indexed
+    # by section, faculty and room, by (department, semester, code, type), and the days
+    # each course meets per section and session type (as in course_days)
+    groups = result['groups']
+    units = []
+    joint = {}
+    for g, group in enumerate(groups):
+        for idx, (request, placement, _) in enumerate(group['results']):
+            if placement is None:
+                continue
+            key = basket_session_key(request) + (placement[0], placement[1]) if request.get('basket') else None
+            if key in joint:
+                units[joint[key]].append((g, idx))
+                continue
+            if key:
+                joint[key] = len(units)
+            units.append([(g, idx)])
+
+    index = {'section': {}, 'faculty': {}, 'room': {}}
+    courses = {}
+    course_days = {}
+    for number, unit in enumerate(units):
+        for g, idx in unit:
+            group = groups[g]
+            request, (day, _, rooms), _ = group['results'][idx]
+            courses.setdefault((str(group['department']), str(group['semester']), request['code'], request['type']),
+                               []).append(number)
+            for section in request['sections']:
+                index['section'].setdefault((group['department'], group['semester'], section), []).append(number)
+                days = course_days.setdefault((group['department'], group['semester'], section) + day_key(request), {})
+                days[day] = days.get(day, 0) + 1
+        lead = groups[unit[0][0]]['results'][unit[0][1]]
+        for fid in lead[0]['faculty_ids']:
+            index['faculty'].setdefault(fid, []).append(number)
+        for room in lead[1][2]:
+            index['room'].setdefault(room[0], []).append(number)
+    return {'result': result, 'inputs': inputs, 'units': units, 'index': index, 'courses': courses,
+            'course_days': course_days, 'rooms_by_no': {room[1]: room for room in inputs['rooms_by_id'].values()}}
+
+def what_if(sandbox, edits):
+    # Apply a batch of edits to a private view of the baseline and re-place every session
+    # they displace. Edits are dicts with an 'edit' key, applied blocks and capacity
+    # changes first, then pins:
+    #   {'edit': 'block_room', 'room': 'C004'[, 'day': 'Monday'][, 'start': '09:00', 'end': '13:00']}
+    #   {'edit': 'block_faculty', 'faculty': '12'[, 'day', 'start', 'end']}
+    #   {'edit': 'room_capacity', 'room': 'C004', 'capacity': 60}
+    #   {'edit': 'pin', 'department': 'CSE', 'semester': '4A', 'code': 'CS164', 'type': 'LEC',
+    #    'day': 'Thursday', 'start': '14:00'[, 'session': 2][, 'section': 'B'][, 'rooms': ['C101']]}
+    # Without a day a block covers the week, without start/end the whole day. A pinned
+    # session pushes out only the sessions it clashes with; displaced sessions are placed
+    # again without moving anything else, as close to their old window as possible.
+    # Returns {'feasible', 'errors', 'pinned', 'displaced', 'milliseconds'}.
+    started = perf_counter()
+    result = sandbox['result']
+    inputs = sandbox['inputs']
+    calendar = result['calendar']
+    groups = result['groups']
+    units = sandbox['units']
+    index = sandbox['index']
+    num_days = len(calendar['days'])
+    # Shallow copies, written through writable(); the room slot index stays behind, so the
+    # sandbox finds free rooms from these masks
+    occupancy = {kind: dict(result['occupancy'][kind]) for kind in OCCUPANCY_KINDS}
+    course_days = dict(sandbox['course_days'])
+    copied = set()
+    for fid, limits in inputs['faculty_limits'].items():
+        # A result rebuilt from a state file has no unavailable slots in its masks
+        masks = occupancy['faculty'].get(fid, [0] * num_days)
+        occupancy['faculty'][fid] = [mask | blocked for mask, blocked in zip(masks, limits['unavailable'])]
+        copied.add((id(occupancy['faculty']), fid))
+    current = {}   # unit number -> placement, where it differs from the baseline
+    displaced = {}  # unit number -> baseline placement, in order of displacement
+    pinned = {}    # unit number -> baseline placement
+    errors = []
+
+    def copies(number):
+        return [(groups[g], groups[g]['results'][idx][0]) for g, idx in units[number]]
+
+    def placement_of(number):
+        if number in current:
+            return current[number]
+        g, idx = units[number][0]
+        return groups[g]['results'][idx][1]
+
+    def writable(table, key, default):
+        # Copy a baseline entry before the first change to it
+        if (id(table), key) not in copied:
+            copied.add((id(table), key))
+            table[key] = type(default)(table.get(key, default))
+        return table[key]
+
+    def unit_keys(number):
+        keys = []
+        for group, request in copies(number):
+            keys += [('section', (group['department'], group['semester'], section)) for section in request['sections']]
+        return keys + [('faculty', fid) for fid in copies(number)[0][1]['faculty_ids']]
+
+    def course_keys(number):
+        return [(group['department'], group['semester'], section) + day_key(request)
+                for group, request in copies(number) for section in request['sections']]
+
+    def set_unit(number, placement):
+        # Move a unit to `placement` (None takes it out), updating masks and day counts
+        duration = copies(number)[0][1]['duration']
+        for placed, change in ((placement_of(number), -1), (placement, 1)):
+            if placed is None:
+                continue
+            day, start_slot, rooms = placed
+            mask = window_mask(start_slot, duration)
+            for kind, key in unit_keys(number) + [('room', room[0]) for room in rooms]:
+                masks = writable(occupancy[kind], key, [0] * num_days)
+                masks[day] = masks[day] | mask if change > 0 else masks[day] & ~mask
+            for key in course_keys(number):
+                days = writable(course_days, key, {})
+                days[day] = days.get(day, 0) + change
+        current[number] = placement
+
+    def unit_days(number):
+        # allowed_days() for a unit against the sandbox's day counts
+        request = copies(number)[0][1]
+        all_days = list(range(num_days))
+        if request['days'] == 'any':
+            return all_days
+        used = [{day for day, count in course_days.get(key, {}).items() if count} for key in course_keys(number)]
+        if request['days'] == 'tutorial':
+            return all_days if all(len(days) < MAX_TUTORIAL_DAYS for days in used) else []
+        if any(len(days) >= MAX_COURSE_DAYS for days in used):
+            return []
+        return [day for day in all_days if not any(day in days for days in used)]
+
+    def occupants(kind, key, day, mask):
+        # Units holding `key` in the window; moved units are checked as well as the index
+        numbers = set(index[kind].get(key, ())) | set(current)
+        found = []
+        for number in numbers:
+            placement = placement_of(number)
+            if not placement or placement[0] != day:
+                continue
+            if not window_mask(placement[1], copies(number)[0][1]['duration']) & mask:
+                continue
+            if kind == 'room' and key not in [room[0] for room in placement[2]]:
+                continue
+            if kind != 'room' and (kind, key) not in unit_keys(number):
+                continue
+            found.append(number)
+        return found
+
+    def displace(number):
+        if number not in displaced and number not in pinned:
+            displaced[number] = placement_of(number)
+            set_unit(number, None)
+
+    def day_index(value):
+        return value if isinstance(value, int) else calendar['days'].index(value)
+
+    def edit_window(edit):
+        # Days and slot mask an edit covers
+        days = [day_index(edit['day'])] if edit.get('day') is not None else list(range(num_days))
+        start = parse_minutes(edit['start']) if edit.get('start') else 0
+        end = parse_minutes(edit['end']) if edit.get('end') else 24 * 60
+        mask = sum(1 << slot for slot, (begin, finish) in enumerate(calendar['slots']) if begin < end and finish > start)
+        return days, mask
+
+    def room_named(name):
+        room = sandbox['rooms_by_no'].get(name)
+        if room is None:
+            errors.append(f"unknown room {name}")
+        return room
+
+    def label(number, placement):
+        if not placement:
+            return None
+        day, start_slot, rooms = placement
+        return {'day': calendar['days'][day], 'start': minutes_label(calendar['slots'][start_slot][0]),
+                'rooms': [room[1] for room in rooms]}
+
+    def keep_rooms(request, old, free):
+        # As many of the old rooms as are free, topped up from the rest (labs: the matched set)
+        if 'students' in request:
+            return free[:request['rooms_needed']]
+        kept = [room for room in old if room in free]
+        return (kept + [room for room in free if room not in kept])[:request['rooms_needed']]
+
+    def describe(number):
+        request = copies(number)[0][1]
+        return {'code': request['code'], 'type': request['type'], 'name': request['name'],
+                'groups': [f"{group['department']} {group['semester']} {'/'.join(request['sections'])}"
+                           for group, request in copies(number)]}
+
+    rooms = dict(inputs['rooms_by_id'])
+    for edit in edits:
+        kind = edit.get('edit')
+        try:
+            if kind in ('block_room', 'block_faculty'):
+                days, mask = edit_window(edit)
+                if kind == 'block_room':
+                    room = room_named(edit['room'])
+                    if room is None:
                         continue
-                    
-                    course_days.setdefault(course_id, set())
-                    max_days = 2  # Limit to 2 days for lectures/labs
-                    
-                    # Schedule labs with strength division
-                    if p > 0:
-                        batch_size = capacity // 2
-                        scheduled = False
-                        attempts = 0
-                        while not scheduled and attempts < max_attempts:
-                            day = random.randint(0, len(DAYS)-1)
-                            if len(TIME_SLOTS) >= LAB_DURATION and len(course_days.get(course_id, set())) < max_days:
-                                start_slot = random.randint(0, len(TIME_SLOTS)-LAB_DURATION)
-                                if course_id in course_days and day in course_days[course_id]:
-                                    continue  # Avoid same day if max days reached
-                                
-                                slots_free = True
-                                for i in range(LAB_DURATION):
-                                    if (is_break_time(TIME_SLOTS[start_slot+i]) or
-                                        timetable[day][start_slot+i]['type'] is not None):
-                                        slots_free = False
-                                        break
-                                
-                                room1_id, room1_no = assign_room(batch_size, True, classroom_schedule, day, start_slot, LAB_DURATION)
-                                room2_id, room2_no = assign_room(batch_size, True, classroom_schedule, day, start_slot, LAB_DURATION)
-                                if room1_id is None or room2_id is None or room1_id == room2_id:
-                                    attempts += 1
-                                    continue
-                                
-                                for fid in faculty_ids.split(';'):
-                                    if fid not in professor_schedule:
-                                        professor_schedule[fid] = {d: set() for d in range(len(DAYS))}
-                                    for i in range(LAB_DURATION):
-                                        if start_slot+i in professor_schedule[fid][day]:
-                                            slots_free = False
-                                            break
-                                
-                                if slots_free:
-                                    print(f"Scheduling lab {code} (section {section}) on {DAYS[day]} at {TIME_SLOTS[start_slot][0]} with rooms {room1_no} and {room2_no}")
-                                    room_id = room1_id
-                                    classroom = room1_no
-                                    for i in range(LAB_DURATION):
-                                        timetable[day][start_slot+i]['type'] = 'LAB'
-                                        timetable[day][start_slot+i]['code'] = code if i == 0 else ''
-                                        timetable[day][start_slot+i]['name'] = name if i == 0 else ''
-                                        timetable[day][start_slot+i]['faculty'] = faculty if i == 0 else ''
-                                        timetable[day][start_slot+i]['classroom'] = classroom if i == 0 else ''
-                                        classroom_schedule[room_id][day].add(start_slot+i)
-                                    # Simulate second room (for visualization)
-                                    room_id = room2_id
-                                    classroom = room2_no
-                                    for i in range(LAB_DURATION):
-                                        timetable[day][start_slot+i]['classroom'] = f"{timetable[day][start_slot+i]['classroom']}/{classroom}"
-                                        classroom_schedule[room_id][day].add(start_slot+i)
-                                    course_days[course_id].add(day)
-                                    for fid in faculty_ids.split(';'):
-                                        for i in range(LAB_DURATION):
-                                            professor_schedule[fid][day].add(start_slot+i)
-                                    scheduled = True
-                            attempts += 1
-                            if attempts >= max_attempts:
-                                print(f"Failed to schedule lab {code} (section {section}) after {max_attempts} attempts due to room/faculty conflicts")
-                    
-                    # Schedule lectures
-                    for _ in range(l):
-                        scheduled = False
-                        attempts = 0
-                        while not scheduled and attempts < max_attempts:
-                            day = random.randint(0, len(DAYS)-1)
-                            if len(TIME_SLOTS) >= LECTURE_DURATION and len(course_days.get(course_id, set())) < max_days:
-                                start_slot = random.randint(0, len(TIME_SLOTS)-LECTURE_DURATION)
-                                if course_id in course_days and day in course_days[course_id]:
-                                    continue  # Avoid same day if max days reached
-                                
-                                slots_free = True
-                                for i in range(LECTURE_DURATION):
-                                    if (is_break_time(TIME_SLOTS[start_slot+i]) or
-                                        timetable[day][start_slot+i]['type'] is not None):
-                                        slots_free = False
-                                        break
-                                
-                                room_id, classroom = assign_room(capacity, False, classroom_schedule, day, start_slot, LECTURE_DURATION)
-                                if room_id is None:
-                                    attempts += 1
-                                    continue
-                                
-                                for fid in faculty_ids.split(';'):
-                                    if fid not in professor_schedule:
-                                        professor_schedule[fid] = {d: set() for d in range(len(DAYS))}
-                                    for i in range(LECTURE_DURATION):
-                                        if start_slot+i in professor_schedule[fid][day]:
-                                            slots_free = False
-                                            break
-                                
-                                if slots_free:
-                                    print(f"Scheduling lecture {code} (section {section}) on {DAYS[day]} at {TIME_SLOTS[start_slot][0]}")
-                                    for i in range(LECTURE_DURATION):
-                                        timetable[day][start_slot+i]['type'] = 'LEC'
-                                        timetable[day][start_slot+i]['code'] = code if i == 0 else ''
-                                        timetable[day][start_slot+i]['name'] = name if i == 0 else ''
-                                        timetable[day][start_slot+i]['faculty'] = faculty if i == 0 else ''
-                                        timetable[day][start_slot+i]['classroom'] = classroom if i == 0 else ''
-                                        for fid in faculty_ids.split(';'):
-                                            professor_schedule[fid][day].add(start_slot+i)
-                                        classroom_schedule[room_id][day].add(start_slot+i)
-                                    course_days[course_id].add(day)
-                                    scheduled = True
-                            attempts += 1
-                            if attempts >= max_attempts:
-                                print(f"Failed to schedule lecture {code} (section {section}) after {max_attempts} attempts due to room/faculty conflicts")
-                    
-                    # Schedule tutorials
-                    for _ in range(t):
-                        if t > 0:  # Debug: Ensure tutorials are attempted
-                            print(f"Attempting to schedule {t} tutorials for {code} (section {section})")
-                        scheduled = False
-                        attempts = 0
-                        while not scheduled and attempts < max_attempts:
-                            day = random.randint(0, len(DAYS)-1)
-                            if len(TIME_SLOTS) >= TUTORIAL_DURATION:
-                                start_slot = random.randint(0, len(TIME_SLOTS)-TUTORIAL_DURATION)
-                                max_tut_days = 3  # Allow up to 3 days for tutorials
-                                if course_id in course_days and len(course_days[course_id]) >= max_tut_days:
-                                    break  # Skip if max tutorial days reached
-                                
-                                slots_free = True
-                                for i in range(TUTORIAL_DURATION):
-                                    if (is_break_time(TIME_SLOTS[start_slot+i]) or
-                                        timetable[day][start_slot+i]['type'] is not None):
-                                        slots_free = False
-                                        break
-                                
-                                room_id, classroom = assign_room(capacity // len(sections[course_id]), False, classroom_schedule, day, start_slot, TUTORIAL_DURATION)
-                                if room_id is None:
-                                    attempts += 1
-                                    continue
-                                
-                                for fid in faculty_ids.split(';'):
-                                    if fid not in professor_schedule:
-                                        professor_schedule[fid] = {d: set() for d in range(len(DAYS))}
-                                    for i in range(TUTORIAL_DURATION):
-                                        if start_slot+i in professor_schedule[fid][day]:
-                                            slots_free = False
-                                            break
-                                
-                                if slots_free:
-                                    print(f"Scheduling tutorial {code} (section {section}) on {DAYS[day]} at {TIME_SLOTS[start_slot][0]}")
-                                    for i in range(TUTORIAL_DURATION):
-                                        timetable[day][start_slot+i]['type'] = 'TUT'
-                                        timetable[day][start_slot+i]['code'] = code if i == 0 else ''
-                                        timetable[day][start_slot+i]['name'] = name if i == 0 else ''
-                                        timetable[day][start_slot+i]['faculty'] = faculty if i == 0 else ''
-                                        timetable[day][start_slot+i]['classroom'] = classroom if i == 0 else ''
-                                        classroom_schedule[room_id][day].add(start_slot+i)
-                                    course_days[course_id].add(day)
-                                    for fid in faculty_ids.split(';'):
-                                        for i in range(TUTORIAL_DURATION):
-                                            professor_schedule[fid][day].add(start_slot+i)
-                                    scheduled = True
-                            attempts += 1
-                            if attempts >= max_attempts:
-                                print(f"Failed to schedule tutorial {code} (section {section}) after {max_attempts} attempts due to room/faculty conflicts")
-            
-            # Write timetables to worksheets (REQ-14)
-            for section in section_timetables:
-                ws = wb.create_sheet(title=f"{department}_{semester}_{section}")
-                timetable = section_timetables[section]['timetable']
-                
-                header = ['Day'] + [f"{slot[0].strftime('%H:%M')}-{slot[1].strftime('%H:%M')}" for slot in TIME_SLOTS]
-                ws.append(header)
-                
-                # Formatting
-                header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-                lec_fill = PatternFill(start_color="E6E6FA", end_color="E6E6FA", fill_type="solid")
-                lab_fill = PatternFill(start_color="98FB98", end_color="98FB98", fill_type="solid")
-                tut_fill = PatternFill(start_color="FFE4E1", end_color="FFE4E1", fill_type="solid")
-                break_fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
-                border = Border(left=Side(style='thin'), right=Side(style='thin'),
-                              top=Side(style='thin'), bottom=Side(style='thin'))
-                header_font = Font(bold=True)
-                
-                for cell in ws[1]:
-                    cell.fill = header_fill
-                    cell.font = header_font
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                
-                # Fill data
-                for day_idx, day in enumerate(DAYS):
-                    row_num = day_idx + 2
-                    ws.append([day])
-                    merge_ranges = []
-                    
-                    for slot_idx in range(len(TIME_SLOTS)):
-                        cell_value = ''
-                        cell_fill = None
-                        
-                        if is_break_time(TIME_SLOTS[slot_idx]):
-                            cell_value = "BREAK"
-                            cell_fill = break_fill
-                        elif timetable[day_idx][slot_idx]['type']:
-                            if timetable[day_idx][slot_idx]['code']:
-                                activity_type = timetable[day_idx][slot_idx]['type']
-                                if activity_type == 'LEC':
-                                    duration = LECTURE_DURATION
-                                    cell_fill = lec_fill
-                                elif activity_type == 'LAB':
-                                    duration = LAB_DURATION
-                                    cell_fill = lab_fill
-                                elif activity_type == 'TUT':
-                                    duration = TUTORIAL_DURATION
-                                    cell_fill = tut_fill
-                                
-                                start_col = get_column_letter(slot_idx + 2)
-                                end_col = get_column_letter(slot_idx + duration + 1)
-                                merge_ranges.append(f"{start_col}{row_num}:{end_col}{row_num}")
-                                
-                                code = timetable[day_idx][slot_idx]['code']
-                                classroom = timetable[day_idx][slot_idx]['classroom']
-                                cell_value = f"{code} {activity_type}\n{classroom}"
-                        
-                        cell = ws.cell(row=row_num, column=slot_idx+2, value=cell_value)
-                        if cell_fill:
-                            cell.fill = cell_fill
-                        cell.border = border
-                        cell.alignment = Alignment(wrap_text=True, vertical='center', horizontal='center')
-                    
-                    for merge_range in merge_ranges:
-                        ws.merge_cells(merge_range)
-                
-                # Adjust dimensions
-                for col_idx in range(1, len(TIME_SLOTS)+2):
-                    ws.column_dimensions[get_column_letter(col_idx)].width = 15
-                for row in ws.iter_rows(min_row=2, max_row=len(DAYS)+1):
-                    ws.row_dimensions[row[0].row].height = 40
-    
-    wb.save("timetables.xlsx")
-    print("Timetables saved to timetables.xlsx")
+                    key = room[0]
+                else:
+                    key = str(edit['faculty'])
+                resource = 'room' if kind == 'block_room' else 'faculty'
+                for day in days:
+                    for number in occupants(resource, key, day, mask):
+                        displace(number)
+                    masks = writable(occupancy[resource], key, [0] * num_days)
+                    masks[day] |= mask
+            elif kind == 'room_capacity':
+                room = room_named(edit['room'])
+                if room is not None:
+                    rooms[room[0]] = (room[0], room[1], int(edit['capacity']), room[3])
+            elif kind != 'pin':
+                errors.append(f"unknown edit {kind!r}; expected one of {', '.join(WHAT_IF_EDITS)}")
+        except (KeyError, ValueError) as e:
+            errors.append(f"bad {kind} edit {edit}: {e}")
+
+    if rooms != inputs['rooms_by_id']:
+        # Sessions whose room no longer seats them (lab batches by batch size) must move
+        inputs = dict(inputs, **room_tables(list(rooms.values())))
+        changed = [room_id for room_id, room in rooms.items() if room != sandbox['inputs']['rooms_by_id'][room_id]]
+        for room_id in changed:
+            for number in index['room'].get(room_id, ()):
+                placement = placement_of(number)
+                if not placement:
+                    continue
+                request = copies(number)[0][1]
+                new_rooms = [rooms[room[0]] for room in placement[2]]
+                if 'students' in request:
+                    fits = all(size <= room[2] for room, size in zip(new_rooms, batch_sizes(new_rooms, request['students'])))
+                else:
+                    fits = rooms[room_id] in request_rooms(inputs, request)
+                if not fits:
+                    displace(number)
+
+    for edit in edits:
+        if edit.get('edit') != 'pin':
+            continue
+        try:
+            numbers = [number for number in sandbox['courses'].get((str(edit['department']), str(edit['semester']),
+                                                                    edit['code'], edit.get('type', 'LEC')), [])
+                       if edit.get('section') is None or edit['section'] in copies(number)[0][1]['sections']]
+            session = int(edit.get('session', 1))  # may come from JSON or a form as '2'
+            number = numbers[session - 1] if 0 < session <= len(numbers) else None
+            if number is None:
+                errors.append(f"no placed {edit.get('type', 'LEC')} {session} of {edit['code']} in "
+                              f"{edit['department']} {edit['semester']}")
+                continue
+            if number in pinned:
+                errors.append(f"{edit['code']} {edit.get('type', 'LEC')} is pinned twice")
+                continue
+            request = copies(number)[0][1]
+            day = day_index(edit['day'])
+            start_slot = ([slot for slot, (begin, _) in enumerate(calendar['slots'])
+                           if begin == parse_minutes(edit['start'])] or [None])[0]
+        except (KeyError, ValueError, TypeError) as e:
+            errors.append(f"bad pin edit {edit}: {e}")
+            continue
+        if start_slot is None or not calendar['starts'][request['duration']] >> start_slot & 1:
+            errors.append(f"{request['code']} {request['type']} cannot start at {edit['start']}: "
+                          "the window crosses a break or the end of the day")
+            continue
+        # A unit an earlier edit displaced is pinned from where it was, not re-placed
+        was_displaced = number in displaced
+        baseline = displaced.pop(number) if was_displaced else placement_of(number)
+        set_unit(number, None)
+
+        def put_back():
+            if was_displaced:
+                displaced[number] = baseline
+            else:
+                set_unit(number, baseline)
+
+        if day not in unit_days(number):
+            errors.append(f"{request['code']} {request['type']} cannot move to {calendar['days'][day]}: "
+                          "the course already meets on its allowed days")
+            put_back()
+            continue
+        mask = window_mask(start_slot, request['duration'])
+        away = [fid for fid in request['faculty_ids']
+                if fid in inputs['faculty_limits'] and inputs['faculty_limits'][fid]['unavailable'][day] & mask]
+        if away:
+            errors.append(f"{request['code']} {request['type']} cannot move to {calendar['days'][day]} "
+                          f"{edit['start']}: {get_faculty_name(result['faculty_names'], away)} unavailable")
+            put_back()
+            continue
+        pinned[number] = baseline
+        before = set(displaced)
+        for resource, key in unit_keys(number):
+            for other in occupants(resource, key, day, mask):
+                if other in pinned:
+                    errors.append(f"{request['code']} {request['type']} clashes with pinned "
+                                  f"{describe(other)['code']} {describe(other)['type']}")
+                displace(other)
+        if not faculty_load_starts(inputs, occupancy, request['faculty_ids'], day, request['duration'],
+                                   1 << start_slot):
+            # Checked once the clashing sessions are out, whose slots no longer count
+            errors.append(f"{request['code']} {request['type']} cannot move to {calendar['days'][day]} "
+                          f"{edit['start']}: {request['faculty']} would teach more than their hours per day "
+                          "or consecutive slots allow")
+            for other in [other for other in displaced if other not in before]:
+                set_unit(other, displaced.pop(other))
+            del pinned[number]
+            put_back()
+            continue
+        wanted = [room_named(name) for name in edit['rooms']] if edit.get('rooms') else None
+        if wanted and None in wanted:
+            continue
+        if wanted is None:
+            free = usable_rooms(request, free_rooms(request_rooms(inputs, request), occupancy, day, start_slot,
+                                                    request['duration']))
+            if free is not None:
+                wanted = keep_rooms(request, baseline[2], free)
+            else:
+                wanted = list(baseline[2])  # keep its rooms and move whoever holds them
+        for room in wanted:
+            for other in occupants('room', room[0], day, mask):
+                if other in pinned:
+                    errors.append(f"{request['code']} {request['type']} needs room {room[1]}, held by pinned "
+                                  f"{describe(other)['code']} {describe(other)['type']}")
+                displace(other)
+        blocked = [room[1] for room in wanted if occupancy['room'].get(room[0], [0] * num_days)[day] & mask
+                   and not occupants('room', room[0], day, mask)]
+        if blocked:
+            errors.append(f"{request['code']} {request['type']} needs room {', '.join(blocked)}, blocked at "
+                          f"{calendar['days'][day]} {edit['start']}, and no other room is free")
+            continue
+        set_unit(number, (day, start_slot, wanted))
+
+    report = {'pinned': [dict(describe(number), **{'from': label(number, baseline),
+                                                   'to': label(number, placement_of(number))})
+                         for number, baseline in pinned.items()],
+              'displaced': []}
+    for number, baseline in displaced.items():
+        group, request = copies(number)[0]
+        if len(units[number]) > 1:
+            request = dict(request, section_keys=[key for resource, key in unit_keys(number) if resource == 'section'])
+        state = {'inputs': inputs, 'calendar': calendar, 'occupancy': occupancy,
+                 'group': (group['department'], group['semester']), 'stats': new_stats()}
+        days = unit_days(number)
+        candidates = find_feasible_slots(request, state, days)
+        entry = dict(describe(number), **{'from': label(number, baseline), 'to': None, 'reason': None})
+        if candidates:
+            # Closest to the old window: same day first, then the nearest start
+            day, start_slot, free = min(candidates, key=lambda c: (c[0] != baseline[0], abs(c[1] - baseline[1]),
+                                                                   c[0], c[1]))
+            set_unit(number, (day, start_slot, keep_rooms(request, baseline[2], free)))
+            entry['to'] = label(number, placement_of(number))
+        else:
+            entry['reason'] = diagnose(request, state, days)
+        report['displaced'].append(entry)
+    report['errors'] = errors
+    report['feasible'] = not errors and all(entry['to'] for entry in report['displaced'])
+    report['milliseconds'] = round((perf_counter() - started) * 1000, 2)
+    return report
+
+# Library API: inputs = load_inputs(); result = schedule(inputs, {'seed': 7}); export(result).
+# The loaded inputs are never modified, so one process can schedule them any number of times.
+DEFAULT_CONFIG = {'engine': 'greedy', 'time_limit': BACKTRACK_TIME_LIMIT, 'seed': None, 'starts': 1,
+                  'workers': None, 'previous': None, 'profile': False, 'improve': 0, 'improve_moves': None}
+
+def schedule(inputs, config=None):
+    # config overrides DEFAULT_CONFIG; 'previous' is a load_state() result to reschedule
+    # incrementally against. A missing seed is drawn at random and recorded in the result.
+    # 'improve' > 0 runs the local search for that many seconds (or 'improve_moves' moves).
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    unknown = set(config) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"unknown config option(s): {', '.join(sorted(unknown))}")
+    if config['engine'] not in SCHEDULERS:
+        raise ValueError(f"unknown engine {config['engine']!r}")
+    seed = random.randrange(2**32) if config['seed'] is None else config['seed']
+    if config['previous'] is not None:
+        result = schedule_incremental(config['previous'], inputs, config['engine'], config['time_limit'], seed,
+                                      config['profile'])
+    elif config['starts'] > 1:
+        result = multi_start(inputs, config['starts'], config['engine'], config['time_limit'], seed,
+                             config['workers'], config['profile'])
+    else:
+        result = schedule_all(inputs, config['engine'], config['time_limit'], seed, config['workers'],
+                              config['profile'])
+    if config['improve'] or config['improve_moves']:
+        # Seeded like the printed seed, so rerunning with it alone gives this timetable
+        improve_schedule(result, inputs, config['improve'] or float('inf'), config['improve_moves'], result['seed'])
+    return result
+
+# Batch mode: a term is a semester type (SEMESTER_TYPE, odd/even) and, within it, a half
+# (the SEMESTER suffix after '_', e.g. premid/postmid). Courses without a suffix run all
+# semester, so they are part of every half of their semester type.
+TERMS_DIRECTORY = "terms"  # --terms writes terms/<term>/timetables.xlsx (+ state file)
+
+def course_term(course):
+    return course.semester_type, course.semester.partition('_')[2]
+
+def term_name(semester_type, half=''):
+    return '_'.join(part for part in (semester_type, half) if part) or 'all'
+
+def schedule_terms(inputs, config=None):
+    # One timetable per term from a single load: the room index and calendar are shared,
+    # each term gets its own occupancy. Semester types are scheduled independently. Within
+    # one, the all-semester courses are placed first; each half is then scheduled against
+    # a copy of that occupancy (the 'reserved' input), since halves never meet. Each stage
+    # runs its terms in parallel processes. config is as for schedule(), except that
+    # 'previous' maps term names to load_state() results. Returns {term name: result}; the
+    # result of a half includes the all-semester groups.
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    if config['seed'] is None:
+        config['seed'] = random.randrange(2**32)
+    previous = config.pop('previous') or {}
+    plan = {}
+    for course in inputs['courses']:
+        semester_type, half = course_term(course)
+        term = plan.setdefault(semester_type, {'full': [], 'halves': {}})
+        (term['halves'].setdefault(half, []) if half else term['full']).append(course)
+
+    def run(jobs):
+        # jobs = [(key, courses, reserved occupancy or None, previous state or None)]
+        parallel = config['workers'] != 1 and len(jobs) > 1
+        term_inputs = [dict(inputs, courses=courses, **({'reserved': reserved} if reserved else {}))
+                       for _, courses, reserved, _ in jobs]
+        term_configs = [dict(config, previous=state, workers=1 if parallel else config['workers'])
+                        for _, _, _, state in jobs]
+        if parallel:
+            with ProcessPoolExecutor(max_workers=config['workers']) as pool:
+                results = list(pool.map(schedule, term_inputs, term_configs))
+        else:
+            results = [schedule(*job) for job in zip(term_inputs, term_configs)]
+        return {key: result for (key, _, _, _), result in zip(jobs, results)}
+
+    # An all-semester part is incrementally rescheduled from the state of its first half,
+    # which holds the same groups
+    full = run([(semester_type, term['full'], None,
+                 previous.get(term_name(semester_type, next(iter(term['halves']), ''))))
+                for semester_type, term in plan.items() if term['full']])
+    halves = run([((semester_type, half), courses, full[semester_type]['occupancy'] if semester_type in full else None,
+                   previous.get(term_name(semester_type, half)))
+                  for semester_type, term in plan.items() for half, courses in term['halves'].items()])
+    results = {}
+    for semester_type, term in plan.items():
+        if not term['halves']:
+            results[term_name(semester_type)] = full[semester_type]
+        for half in term['halves']:
+            result = halves[(semester_type, half)]
+            if semester_type in full:
+                result = dict(result, groups=full[semester_type]['groups'] + result['groups'],
+                              components=full[semester_type]['components'] + result['components'])
+            results[term_name(semester_type, half)] = result
+    return results
+
+def export(result, path="timetables.xlsx", views='excel', state_path=STATE_PATH):
+    # Workbook (plus views) and, unless state_path is None, the schedule state file
+    write_workbook(result, path, views)
+    if state_path:
+        save_state(result, state_path)
+
+class JsonLinesFormatter(logging.Formatter):
+    # One JSON object per record: time, level, message and the record's 'event' fields
+    def format(self, record):
+        entry = {'time': round(record.created, 3), 'level': record.levelname, 'message': record.getMessage()}
+        entry.update(getattr(record, 'event', {}))
+        return json.dumps(entry, default=plain)
+
+def configure_logging(level='info', json_path=None):
+    # Console output at `level`; with json_path every record down to debug (one per
+    # session) is also written there as JSON lines for offline analysis
+    console = logging.StreamHandler()
+    console.setLevel(level.upper())
+    console.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+    handlers = [console]
+    if json_path:
+        events = logging.FileHandler(json_path, mode='w')
+        events.setLevel(logging.DEBUG)
+        events.setFormatter(JsonLinesFormatter())
+        handlers.append(events)
+    logger.handlers = handlers
+    logger.setLevel(min(handler.level for handler in handlers))
+    logger.propagate = False
+
+# Result cache: a finished run's output files stored under a hash of everything they
+# depend on, so an identical run copies them back instead of scheduling and exporting.
+# Entries are directories named by the key; a hit refreshes the entry's mtime, and the
+# least recently used entries are removed once the cache outgrows its size limit.
+CACHE_DIRECTORY = ".timetable_cache"
+CACHE_MAX_MB = 500
+
+def cache_key(inputs, config, views, terms):
+    # The parsed inputs (so CSV formatting and row order within a group do not matter
+    # more than they do to the scheduler), calendar, session lengths, the options that
+    # change the result (not workers or profiling), the outputs asked for, and this
+    # file's code, so a new version never serves an old timetable
+    import hashlib
+    digest = hashlib.sha256()
+    with open(__file__, 'rb') as f:
+        digest.update(f.read())
+    content = {'courses': inputs['courses'], 'faculty_names': inputs['faculty_names'],
+               'faculty_limits': inputs['faculty_limits'],
+               'baskets': sorted([list(key), members] for key, members in inputs['baskets'].items()),
+               'rooms': sorted(inputs['rooms_by_id'].values()), 'calendar': inputs['calendar']['config'],
+               'durations': SESSION_MINUTES,
+               'config': {option: config[option] for option in ('engine', 'time_limit', 'seed', 'starts', 'improve',
+                                                                'improve_moves')},
+               'views': views, 'terms': terms}
+    digest.update(json.dumps(content, sort_keys=True, default=plain).encode())
+    return digest.hexdigest()
+
+def cache_fetch(directory, key):
+    # Copy a cached run's files back to where it wrote them; returns their paths, or None
+    import shutil
+    entry = os.path.join(directory, key)
+    try:
+        with open(os.path.join(entry, 'files.json')) as f:
+            paths = json.load(f)
+        for path in paths:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(os.path.join(entry, 'files', path), path)
+    except (OSError, ValueError):
+        return None
+    os.utime(entry)
+    return paths
+
+def cache_store(directory, key, paths, max_mb=CACHE_MAX_MB):
+    # Store the files (relative paths) under `key`, then evict least recently used entries
+    import shutil
+    import tempfile
+    os.makedirs(directory, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=directory, prefix='.new-')
+    for path in paths:
+        os.makedirs(os.path.join(staging, 'files', os.path.dirname(path)), exist_ok=True)
+        shutil.copyfile(path, os.path.join(staging, 'files', path))
+    with open(os.path.join(staging, 'files.json'), 'w') as f:
+        json.dump(paths, f)
+    entry = os.path.join(directory, key)
+    shutil.rmtree(entry, ignore_errors=True)
+    os.replace(staging, entry)
+
+    def size(path):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    entries = sorted((os.path.getmtime(os.path.join(directory, name)), name) for name in os.listdir(directory)
+                     if not name.startswith('.'))
+    sizes = {name: size(os.path.join(directory, name)) for _, name in entries}
+    total = sum(sizes.values())
+    for _, name in entries:
+        if total <= max_mb * 2**20 or name == key:
+            continue
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        total -= sizes[name]
+        logger.debug("Cache: evicted %s", name)
+
+def generate_all_timetables(engine='greedy', time_limit=BACKTRACK_TIME_LIMIT, seed=None, starts=1, workers=None,
+                            incremental=False, views='excel', paths=None, profile=False, improve=0,
+                            improve_moves=None, terms=False, cache=None, cache_mb=CACHE_MAX_MB):
+    # cache is a cache directory, or None for no cache; only runs with a seed can be served
+    # from it, and incremental runs neither read nor fill it
+    phases = {}
+    started = perf_counter()
+    inputs = load_inputs(paths)
+    for message in inputs['warnings']:
+        logger.warning(message)
+    phases['load'] = perf_counter() - started
+    config = {'engine': engine, 'time_limit': time_limit, 'seed': seed, 'starts': starts, 'workers': workers,
+              'profile': profile, 'improve': improve, 'improve_moves': improve_moves}
+    cache = None if incremental else cache
+    if cache and seed is not None:
+        key = cache_key(inputs, config, views, terms)
+        restored = cache_fetch(cache, key)
+        if restored:
+            logger.info("Cache hit %s: restored %s", key[:12], ', '.join(restored))
+            return
+    started = perf_counter()
+    if terms:
+        previous = {}
+        if incremental and os.path.isdir(TERMS_DIRECTORY):
+            for name in os.listdir(TERMS_DIRECTORY):
+                path = os.path.join(TERMS_DIRECTORY, name, STATE_PATH)
+                if os.path.exists(path):
+                    previous[name] = load_state(path)
+        results = schedule_terms(inputs, dict(config, previous=previous))
+        outputs = {name: os.path.join(TERMS_DIRECTORY, name) for name in results}
+    else:
+        results = {None: schedule(inputs, dict(config, previous=load_state() if incremental else None))}
+        outputs = {None: ''}
+    phases['schedule'] = perf_counter() - started
+
+    started = perf_counter()
+    for name, result in results.items():
+        if name:
+            logger.info("Term %s (written to %s)", name, outputs[name])
+        logger.info("Scheduled %d department/semester groups as %d independent component(s)",
+                    len(result['groups']), result['components'])
+        for group in result['groups']:
+            report_results(group, result['calendar'])
+        log_summary(run_summary(result))
+        unplaced, gaps, utilisation = score_schedule(result)
+        # An incremental run also depends on the state file it started from
+        hint = (f"rerun with --seed {result['seed']} and the same previous state to regenerate" if incremental
+                else f"rerun with --seed {result['seed']} to regenerate")
+        logger.info("Seed %s: %d unplaced, %d idle slots, %.1f%% seat utilisation (%s)",
+                    result['seed'], unplaced, gaps, -utilisation * 100, hint)
+        if outputs[name]:
+            os.makedirs(outputs[name], exist_ok=True)
+        export(result, os.path.join(outputs[name], "timetables.xlsx"), views,
+               os.path.join(outputs[name], STATE_PATH))
+    phases['export'] = perf_counter() - started
+    if cache and (seed is not None or starts == 1):
+        # Stored under the --seed given. A drawn seed is only a key of its own for a
+        # single start: with --starts it names the winning start, not the run, so a run
+        # without --seed and with several starts is not stored.
+        key = cache_key(inputs, config if seed is not None else
+                        dict(config, seed=next(iter(results.values()))['seed']), views, terms)
+        files = [os.path.join(directory, name) for directory in outputs.values()
+                 for name in ('timetables.xlsx', STATE_PATH) + (VIEW_CSV_FILES if views == 'csv' else ())]
+        cache_store(cache, key, files, cache_mb)
+        logger.info("Cache: stored run as %s", key[:12])
+    if profile:
+        for result in results.values():
+            log_profile(result, phases)
+
 
 if __name__ == "__main__":
-    generate_all_timetables()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate timetables.xlsx from the CSV inputs")
+    parser.add_argument('--engine', choices=sorted(SCHEDULERS), default='greedy',
+                        help="scheduling engine (default: greedy)")
+    parser.add_argument('--time-limit', type=float, default=BACKTRACK_TIME_LIMIT,
+                        help="seconds per department/semester for the backtracking engine")
+    parser.add_argument('--seed', type=int, help="random seed; the same seed reproduces the same timetable")
+    parser.add_argument('--starts', type=int, default=1,
+                        help="number of independent seeded passes to run in parallel, keeping the best")
+    parser.add_argument('--workers', type=int, help="worker processes for --starts (default: all cores)")
+    parser.add_argument('--incremental', action='store_true',
+                        help=f"re-place only sessions whose courses or rooms changed since the run saved in {STATE_PATH}")
+    parser.add_argument('--views', choices=['excel', 'csv', 'none'], default='excel',
+                        help="faculty, room and room-utilisation views as workbook sheets (default), CSV files, or none")
+    parser.add_argument('--log-level', choices=['debug', 'info', 'warning', 'error'], default='info',
+                        help="console detail; 'debug' lists every scheduled and failed session (default: info)")
+    parser.add_argument('--log-json', metavar='PATH',
+                        help="also write every log record, including per-session events, as JSON lines to PATH")
+    parser.add_argument('--calendar', metavar='PATH',
+                        help=f"JSON file with days, start, end, slot_minutes and breaks (default: {CALENDAR_PATH} "
+                             "if present, else the built-in week)")
+    parser.add_argument('--profile', action='store_true',
+                        help="time the run phases, the section/faculty/room checks and every course's slot searches")
+    parser.add_argument('--profile-dump', metavar='PATH',
+                        help="write a cProfile dump of the run to PATH (pstats format; combine with --workers 1 "
+                             "to include the scheduling itself)")
+    parser.add_argument('--improve', type=float, nargs='?', const=IMPROVE_TIME_LIMIT, default=0, metavar='SECONDS',
+                        help="after scheduling, run a local search that fills gaps, places unplaced sessions and "
+                             f"frees large rooms for SECONDS (default when given: {IMPROVE_TIME_LIMIT:g})")
+    parser.add_argument('--improve-moves', type=int, metavar='N',
+                        help="stop the local search after N moves; with a move limit the result depends only on "
+                             "the seed")
+    parser.add_argument('--cache', nargs='?', const=CACHE_DIRECTORY, metavar='DIR',
+                        help="reuse the outputs of an earlier run with the same inputs, options and --seed, and keep "
+                             f"this run's outputs for later (default directory when given: {CACHE_DIRECTORY})")
+    parser.add_argument('--cache-size', type=float, default=CACHE_MAX_MB, metavar='MB',
+                        help="evict least recently used cache entries beyond this size (default: %(default)g)")
+    parser.add_argument('--terms', action='store_true',
+                        help=f"batch mode: schedule every term (SEMESTER_TYPE and premid/postmid half) on its own, "
+                             f"in parallel, into {TERMS_DIRECTORY}/<term>/")
+    args = parser.parse_args()
+    configure_logging(args.log_level, args.log_json)
+    profiler = None
+    if args.profile_dump:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        generate_all_timetables(args.engine, args.time_limit, args.seed, args.starts, args.workers, args.incremental,
+                                args.views, {'calendar': args.calendar} if args.calendar else None, args.profile,
+                                args.improve, args.improve_moves, args.terms, args.cache, args.cache_size)
+    except InputError as e:
+        for message in e.errors:
+            logger.error(message)
+        exit(1)
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile_dump)
+        logger.info("cProfile stats saved to %s", args.profile_dump)
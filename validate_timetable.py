@@ -0,0 +1,234 @@
+import argparse
+import csv
+import os
+import re
+import sys
+from time import perf_counter
+
+import timetable_generator as tg
+
+# Checks a finished timetable independently of the scheduler. A schedule is read from a
+# state file (everything needed is in it) or from an exported workbook (faculty, capacities
+# and rooms then come from courses.csv and rooms.csv), turned into a flat list of sessions,
+# and checked in one pass: every slot of every session is looked up in a per-(resource,
+# day) table of slot owners, so the work grows linearly with the number of sessions.
+CHECKS = ('room clash', 'faculty clash', 'section overlap', 'break', 'room type', 'capacity', 'unmet sessions')
+
+def read_csv_rows(path):
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+def course_table(rows):
+    # {(department, semester, code): row}; SEMESTER as written, like the group names
+    return {(row['DEPARTMENT'].strip(), row['SEMESTER'].strip(), row['COURSE_CODE'].strip()): row for row in rows}
+
+def hours(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def basket_key(semester, code):
+    # Rows taught as one basket: same basket (the B1, B2, ... prefix of the code, as in
+    # plan_baskets), semester number and term
+    basket = re.match(r'B\d+', code)
+    number = re.match(r'\d*', semester).group()
+    return (basket.group() if basket else code, number, semester.partition('_')[2])
+
+def joint_key(semester, code, session_type, day, start_slot):
+    # Copies of one basket session in different groups: same basket, same window
+    return basket_key(semester, code) + (session_type, day, start_slot)
+
+def combined(row):
+    return str(row.get('COMBINED', '')).strip().upper() == 'TRUE'
+
+def sessions_from_state(saved):
+    # Placed sessions plus the calendar and the sections of every group of a state file
+    header = saved['header']
+    calendar = tg.build_calendar(header.get('calendar'))
+    rooms = header['rooms']
+    sessions = []
+    for row in saved['sessions']:
+        if row['day'] is None:
+            continue
+        placed = [rooms[room_id] for room_id in row['rooms']]
+        seats = (tg.batch_sizes(placed, row['students']) if 'students' in row
+                 else [row['room_capacity']] * len(placed))
+        sessions.append({'group': (str(row['department']), str(row['semester'])), 'sections': row['sections'],
+                         'code': row['code'], 'type': row['type'], 'day': row['day'],
+                         'start_slot': row['start_slot'], 'duration': row['duration'], 'is_lab': row['is_lab'],
+                         'rooms': placed, 'seats': seats, 'faculty_ids': row['faculty_ids'],
+                         'joint': (row['basket'], row['type'], row['basket_session']) if row.get('basket') else None})
+    groups = {(str(department), str(semester)): sections for department, semester, sections in header['groups']}
+    return sessions, calendar, groups
+
+def sessions_from_workbook(path, courses, rooms):
+    # Section sheets of an exported workbook ("<department>_<semester>_<section>", named
+    # after the course rows); the view sheets are skipped. A cell holds "<code> <type>"
+    # and its rooms, or "B1 L105 (44), ..." for lab batches.
+    from openpyxl import load_workbook
+    rooms_by_no = {row['room no'].strip(): (int(row['id']), row['room no'].strip(), int(row['capacity']),
+                                            row['room type'].strip())
+                   for row in rooms}
+    group_names = {(department, semester) for department, semester, _ in courses}
+    cohorts = {}  # students of each basket, over all its rows
+    for (_, semester, code), row in courses.items():
+        if combined(row):
+            key = basket_key(semester, code)
+            cohorts[key] = cohorts.get(key, 0) + int(hours(row.get('CAPACITY')))
+    wb = load_workbook(path, read_only=True)
+    sessions = []
+    groups = {}
+    calendar = None
+    for ws in wb.worksheets:
+        matches = [group for group in group_names if ws.title.startswith(f"{group[0]}_{group[1]}_")]
+        if not matches:
+            continue
+        group = max(matches, key=lambda group: len(group[1]))
+        section = ws.title[len(f"{group[0]}_{group[1]}_"):]
+        groups.setdefault(group, []).append(section)
+        rows = list(ws.iter_rows(values_only=True))
+        if calendar is None:
+            # Slots come from the header labels, breaks from the BREAK cells
+            labels = [label for label in rows[0][1:] if label]
+            slots = [tuple(tg.parse_minutes(time) for time in label.split('-')) for label in labels]
+            break_slots = {slot for slot in range(len(slots)) if rows[1][slot + 1] == 'BREAK'}
+            calendar = {'days': [row[0] for row in rows[1:]], 'slots': slots, 'break_slots': break_slots,
+                        'break_mask': sum(1 << slot for slot in break_slots),
+                        'durations': {session_type: minutes // (slots[0][1] - slots[0][0])
+                                      for session_type, minutes in tg.SESSION_MINUTES.items()}}
+        for day, row in enumerate(rows[1:]):
+            for slot, value in enumerate(row[1:len(calendar['slots']) + 1]):
+                if not value or value == 'BREAK':
+                    continue
+                first, _, room_text = str(value).partition('\n')
+                code, _, session_type = first.rpartition(' ')
+                batches = re.findall(r'B\d+ (\S+) \((\d+)\)', room_text)
+                names = [name for name, _ in batches] if batches else [name for name in room_text.split('/') if name]
+                placed = [rooms_by_no.get(name, (None, name, 0, '')) for name in names]
+                course = courses.get(group + (code,), {})
+                if batches:
+                    seats = [int(size) for _, size in batches]
+                elif combined(course) and len(placed) > 1:
+                    seats = [None] * len(placed)  # the member split is not in the workbook
+                elif combined(course):
+                    seats = [cohorts[basket_key(group[1], code)]] * len(placed)
+                else:
+                    seats = [int(hours(course.get('CAPACITY')))] * len(placed)
+                fids = [fid.strip() for fid in str(course.get('FACULTY_ID', '')).split(';') if fid.strip()]
+                joint = joint_key(group[1], code, session_type, day, slot) if combined(course) else None
+                sessions.append({'group': group, 'sections': [section], 'code': code, 'type': session_type,
+                                 'day': day, 'start_slot': slot, 'duration': calendar['durations'].get(session_type, 1),
+                                 'is_lab': session_type == 'LAB', 'rooms': placed, 'seats': seats,
+                                 'faculty_ids': [tg.faculty_id_text(fid) for fid in fids], 'joint': joint})
+    wb.close()
+    return sessions, calendar, groups
+
+def validate(sessions, calendar, groups, courses=None):
+    # One pass over the sessions; returns [(check, message), ...]. The copies of a basket
+    # session share their faculty and rooms, so those are booked once per joint session.
+    # With course rows, the sessions per section and type are compared with the number
+    # the scheduler makes from L/T/P (session_counts) for the groups in the schedule.
+    violations = []
+    owners = {}  # (kind, key, day) -> [session per slot]
+    booked = set()
+    scheduled = {}  # (department, semester, section, code, type) -> sessions
+    num_slots = len(calendar['slots'])
+
+    def describe(session):
+        department, semester = session['group']
+        return f"{session['code']} {session['type']} ({department} {semester} {'/'.join(session['sections'])})"
+
+    def when(session):
+        start, end = session['start_slot'], min(session['start_slot'] + session['duration'], num_slots) - 1
+        return (f"{calendar['days'][session['day']]} "
+                f"{tg.minutes_label(calendar['slots'][start][0])}-{tg.minutes_label(calendar['slots'][end][1])}")
+
+    def book(check, kind, key, label, session):
+        slots = owners.setdefault((kind, key, session['day']), [None] * num_slots)
+        clashes = set()
+        for slot in range(session['start_slot'], min(session['start_slot'] + session['duration'], num_slots)):
+            other = slots[slot]
+            if other is not None and id(other) not in clashes:
+                clashes.add(id(other))
+                violations.append((check, f"{label} at {when(session)}: {describe(other)} and {describe(session)}"))
+            slots[slot] = session
+
+    for session in sessions:
+        mask = tg.window_mask(session['start_slot'], session['duration'])
+        if mask & calendar['break_mask'] or session['start_slot'] + session['duration'] > num_slots:
+            violations.append(('break', f"{describe(session)} at {when(session)} runs into a break or past the day"))
+        department, semester = session['group']
+        for section in session['sections']:
+            book('section overlap', 'section', (department, semester, section),
+                 f"{department} {semester} section {section}", session)
+            key = (department, semester, section, session['code'], session['type'])
+            scheduled[key] = scheduled.get(key, 0) + 1
+        if session['joint'] is not None:
+            if session['joint'] in booked:
+                continue
+            booked.add(session['joint'])
+        for fid in dict.fromkeys(session['faculty_ids']):
+            book('faculty clash', 'faculty', fid, f"faculty {fid}", session)
+        for room, seats in zip(session['rooms'], session['seats']):
+            book('room clash', 'room', room[1], f"room {room[1]}", session)
+            lab_room = room[3] in tg.LAB_ROOM_TYPES
+            if room[0] is None:
+                violations.append(('room type', f"{describe(session)} at {when(session)} is in unknown room {room[1]}"))
+            elif lab_room != session['is_lab']:
+                violations.append(('room type', f"{describe(session)} at {when(session)} is in {room[3]} {room[1]}"))
+            if room[0] is not None and seats is not None and seats > room[2]:
+                violations.append(('capacity', f"{describe(session)} at {when(session)} puts {seats} students in "
+                                               f"{room[1]} ({room[2]} seats)"))
+
+    if courses:
+        # A course counts in the sections it appears in, or in all sections of its group;
+        # hours are whole numbers as in parse_courses
+        appears = {}
+        for department, semester, section, code, _ in scheduled:
+            appears.setdefault((department, semester, code), set()).add(section)
+        for (department, semester, code), row in courses.items():
+            if (department, semester) not in groups:
+                continue
+            for section in sorted(appears.get((department, semester, code)) or groups[(department, semester)]):
+                required = tg.session_counts(*(int(hours(row.get(column))) for column in ('L', 'T', 'P')))
+                for session_type, count in required.items():
+                    got = scheduled.get((department, semester, section, code, session_type), 0)
+                    if got < count:
+                        violations.append(('unmet sessions', f"{code} ({department} {semester} {section}): {got} of "
+                                                             f"{count} {tg.SESSION_NAMES[session_type]} sessions"))
+    return violations
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check a generated timetable for clashes and unmet sessions")
+    parser.add_argument('schedule', nargs='?', default=tg.STATE_PATH,
+                        help=f"state file or exported .xlsx workbook (default: {tg.STATE_PATH})")
+    parser.add_argument('--courses', default=tg.INPUT_PATHS['courses'],
+                        help="course rows for the L/T/P hours, and for a workbook also faculty and capacities "
+                             "(default: %(default)s; the sessions check is skipped when it does not exist)")
+    parser.add_argument('--rooms', default=tg.INPUT_PATHS['rooms'],
+                        help="room table for a workbook (default: %(default)s)")
+    parser.add_argument('--summary', action='store_true', help="print only the count per check")
+    args = parser.parse_args()
+
+    started = perf_counter()
+    courses = course_table(read_csv_rows(args.courses))
+    if args.schedule.endswith('.xlsx'):
+        sessions, calendar, groups = sessions_from_workbook(args.schedule, courses, read_csv_rows(args.rooms))
+    else:
+        sessions, calendar, groups = sessions_from_state(tg.load_state(args.schedule))
+    if calendar is None:
+        print(f"{args.schedule}: no section timetables found")
+        sys.exit(1)
+    violations = validate(sessions, calendar, groups, courses)
+    if not args.summary:
+        for check, message in violations:
+            print(f"{check}: {message}")
+    counts = {check: 0 for check in CHECKS}
+    for check, _ in violations:
+        counts[check] += 1
+    print(f"{len(sessions)} sessions checked in {perf_counter() - started:.3f}s: "
+          + ', '.join(f"{count} {check}" for check, count in counts.items()))
+    sys.exit(1 if violations else 0)